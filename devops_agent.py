@@ -573,8 +573,8 @@ python-dotenv==1.0.1
 
 # Meta WhatsApp API
 requests==2.31.0
-flask==3.0.2
-werkzeug==3.0.1
+fastapi==0.110.0
+uvicorn==0.27.1
 
 # OAuth handling
 authlib==1.3.0
@@ -4,16 +4,129 @@ Automatically extracts and manages environment variables from your chatbot proje
 """
 
 import os
+import sys
 import json
 import logging
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
+
+    json_loads = json.loads
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Directories never worth descending into
+SKIP_DIRS = frozenset({'node_modules', 'venv', '.git', '__pycache__'})
+
+# Source files scanned for env var references
+SOURCE_EXTS = ('.py', '.js', '.ts', '.jsx', '.tsx')
+
+# Minified bundles / sourcemaps and oversized files are never hand-written config
+JUNK_EXTS = ('.min.js', '.min.css', '.map')
+MAX_SCAN_BYTES = 2_000_000
+
+# Service categories in priority order: first category with a matching keyword wins
+CATEGORY_KEYWORDS = [
+    ('meta', ('meta', 'facebook', 'whatsapp', 'instagram')),
+    ('google', ('google', 'gmail', 'gcal')),
+    ('microsoft', ('microsoft', 'outlook', 'azure')),
+    ('openai', ('openai', 'gpt')),
+    ('anthropic', ('anthropic', 'claude')),
+    ('database', ('database', 'db', 'postgres', 'mongo')),
+    ('flowise', ('flowise',)),
+    ('render', ('render',)),
+]
+
+# Output order and section headings for categorized variables
+CATEGORY_ORDER = [
+    ('meta', 'Meta/WhatsApp Business API'),
+    ('google', 'Google Services (OAuth, Gmail, etc)'),
+    ('microsoft', 'Microsoft Services (Outlook, Azure)'),
+    ('openai', 'OpenAI API'),
+    ('anthropic', 'Anthropic/Claude API'),
+    ('database', 'Database Configuration'),
+    ('flowise', 'Flowise AI'),
+    ('render', 'Render Deployment'),
+    ('other', 'Other Configuration'),
+]
+
+# One lookahead per category keeps the priority order in a single regex match
+CATEGORY_RE = re.compile('|'.join(
+    f'(?=.*(?:{"|".join(keywords)}))(?P<{category}>)'
+    for category, keywords in CATEGORY_KEYWORDS
+), re.DOTALL)
+
+# process.env.NAME (JS) or os.getenv('NAME') (Python); bytes so files skip decoding
+ENV_RE = re.compile(rb'process\.env\.(\w+)|os\.getenv\([\'"](\w+)[\'"]\)')
+
+
+def walk_source_files(path: str, rel_dir: str = ''):
+    """Yield (path, path relative to the walk root) for source files under path"""
+    # Locals avoid global/attribute lookups per directory entry
+    prefix = rel_dir + os.sep if rel_dir else ''
+    skip_dirs, source_exts, junk_exts, max_bytes = SKIP_DIRS, SOURCE_EXTS, JUNK_EXTS, MAX_SCAN_BYTES
+    
+    # Unreadable directories are logged and skipped, as os.walk does
+    try:
+        it = os.scandir(path)
+    except OSError as e:
+        logger.debug(f"Could not list {path}: {e}")
+        return
+    
+    with it:
+        for entry in it:
+            name = entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError as e:
+                logger.debug(f"Could not stat {entry.path}: {e}")
+                continue
+            if is_dir:
+                if name not in skip_dirs:
+                    yield from walk_source_files(entry.path, prefix + name)
+            elif name.endswith(source_exts) and not name.endswith(junk_exts):
+                # Oversized bundles are skipped here, without ever being opened;
+                # DirEntry.stat() reuses the scan's data on Windows
+                try:
+                    if entry.stat(follow_symlinks=False).st_size > max_bytes:
+                        continue
+                except OSError:
+                    continue
+                yield entry.path, prefix + name
+
+
+def scan_file(filepath: str) -> List[str]:
+    """Return env var names referenced in a single source file"""
+    try:
+        with open(filepath, 'rb') as f:
+            content = f.read(MAX_SCAN_BYTES + 1)
+    except Exception as e:
+        logger.debug(f"Could not read {filepath}: {e}")
+        return []
+    
+    # Backstop for files that grew after the walk or were passed in directly
+    if len(content) > MAX_SCAN_BYTES:
+        return []
+    
+    # Exactly one group participates in each match, so lastindex picks it
+    return [m[m.lastindex].decode('ascii') for m in ENV_RE.finditer(content)]
+
+
 class EnvExtractor:
     """Extract and manage environment variables for clarity-pearl-production"""
     
@@ -22,6 +135,13 @@ class EnvExtractor:
         self.env_vars = {}
         self.vault_path = "clarity_env_vault.json"
         
+        # Parsed .env, reused while the file's mtime/size are unchanged
+        self._env_cache: Optional[Dict[str, str]] = None
+        self._env_stamp = None
+        
+        # Last project scan, reused by menu actions until refreshed
+        self._scan_cache: Optional[Dict[str, List[str]]] = None
+        
     def find_project(self) -> str:
         """Try to find clarity-pearl-production directory"""
         print("\n🔍 Looking for clarity-pearl-production project...")
@@ -36,9 +156,14 @@ class EnvExtractor:
             os.path.join(os.path.dirname(os.getcwd()), "clarity-pearl-production")
         ]
         
+        # Without a TTY (or unless CLARITY_INTERACTIVE=1) take the first hit unprompted
+        interactive = sys.stdin.isatty() and os.environ.get('CLARITY_INTERACTIVE') == '1'
+        
         for path in possible_paths:
-            if os.path.exists(path):
+            if os.path.isdir(path):
                 logger.info(f"✅ Found project at: {path}")
+                if not interactive:
+                    return path
                 confirm = input(f"Use this path? (y/n): ").strip().lower()
                 if confirm == 'y':
                     return path
@@ -63,60 +188,59 @@ class EnvExtractor:
                 return self.find_project()
             return None
     
-    def scan_for_env_vars(self) -> Dict[str, List[str]]:
+    def scan_for_env_vars(self, force: bool = False) -> Dict[str, List[str]]:
         """Scan project files for environment variable usage"""
         if not self.project_path:
             logger.error("❌ No project path set")
             return {}
         
-        env_pattern = re.compile(r'process\.env\.(\w+)|os\.getenv\([\'"](\w+)[\'"]\)')
-        found_vars = {}
+        if self._scan_cache is not None and not force:
+            return self._scan_cache
+        
+        found_vars = defaultdict(list)
         
         logger.info("🔍 Scanning project for environment variables...")
         
-        # Scan all Python and JavaScript files
-        for root, dirs, files in os.walk(self.project_path):
-            # Skip node_modules, venv, etc.
-            dirs[:] = [d for d in dirs if d not in ['node_modules', 'venv', '.git', '__pycache__']]
-            
-            for file in files:
-                if file.endswith(('.py', '.js', '.ts', '.jsx', '.tsx')):
-                    filepath = os.path.join(root, file)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            matches = env_pattern.findall(content)
-                            
-                            for match in matches:
-                                var_name = match[0] or match[1]
-                                if var_name:
-                                    if var_name not in found_vars:
-                                        found_vars[var_name] = []
-                                    rel_path = os.path.relpath(filepath, self.project_path)
-                                    found_vars[var_name].append(rel_path)
-                    except Exception as e:
-                        logger.debug(f"Could not read {filepath}: {e}")
+        # Scan all Python and JavaScript files; reads are I/O-bound so threads overlap them
+        files = list(walk_source_files(self.project_path))
+        paths = [filepath for filepath, _ in files]
+        workers = min(32, (os.cpu_count() or 1) * 4)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (_, rel_path), names in zip(files, executor.map(scan_file, paths)):
+                for var_name in names:
+                    found_vars[var_name].append(rel_path)
         
         logger.info(f"✅ Found {len(found_vars)} environment variables")
-        return found_vars
+        self._scan_cache = dict(found_vars)
+        return self._scan_cache
     
     def read_existing_env(self) -> Dict[str, str]:
         """Read existing .env file from clarity-pearl-production"""
         env_file = os.path.join(self.project_path, '.env')
         env_vars = {}
         
-        if not os.path.exists(env_file):
+        try:
+            st = os.stat(env_file)
+        except OSError:
             logger.warning("⚠️  No .env file found in project")
             return env_vars
         
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._env_cache is not None and stamp == self._env_stamp:
+            return dict(self._env_cache)
+        
         try:
-            with open(env_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        env_vars[key.strip()] = value.strip()
+            data = Path(env_file).read_bytes().decode('utf-8', 'ignore')
+            for line in data.splitlines():
+                line = line.strip()
+                if not line or line[0] == '#' or '=' not in line:
+                    continue
+                key, _, value = line.partition('=')
+                env_vars[key.strip()] = value.strip()
             
+            self._env_cache = dict(env_vars)
+            self._env_stamp = stamp
             logger.info(f"✅ Read {len(env_vars)} variables from .env")
             return env_vars
             
@@ -126,42 +250,14 @@ class EnvExtractor:
     
     def categorize_env_vars(self, env_vars: Dict[str, str]) -> Dict[str, Dict[str, str]]:
         """Categorize environment variables by service"""
-        categories = {
-            'meta': {},
-            'google': {},
-            'microsoft': {},
-            'openai': {},
-            'anthropic': {},
-            'database': {},
-            'flowise': {},
-            'render': {},
-            'other': {}
-        }
+        # Categories are created on first use, so empty ones never appear
+        categories = defaultdict(dict)
         
         for key, value in env_vars.items():
-            key_lower = key.lower()
-            
-            if any(x in key_lower for x in ['meta', 'facebook', 'whatsapp', 'instagram']):
-                categories['meta'][key] = value
-            elif any(x in key_lower for x in ['google', 'gmail', 'gcal']):
-                categories['google'][key] = value
-            elif any(x in key_lower for x in ['microsoft', 'outlook', 'azure']):
-                categories['microsoft'][key] = value
-            elif 'openai' in key_lower or 'gpt' in key_lower:
-                categories['openai'][key] = value
-            elif 'anthropic' in key_lower or 'claude' in key_lower:
-                categories['anthropic'][key] = value
-            elif any(x in key_lower for x in ['database', 'db', 'postgres', 'mongo']):
-                categories['database'][key] = value
-            elif 'flowise' in key_lower:
-                categories['flowise'][key] = value
-            elif 'render' in key_lower:
-                categories['render'][key] = value
-            else:
-                categories['other'][key] = value
-        
-        # Remove empty categories
-        return {k: v for k, v in categories.items() if v}
+            m = CATEGORY_RE.match(key.lower())
+            categories[m.lastgroup if m else 'other'][key] = value
+        
+        return dict(categories)
     
     def generate_env_template(self, used_vars: Dict[str, List[str]]) -> str:
         """Generate .env.example with documentation"""
@@ -184,28 +280,18 @@ class EnvExtractor:
         # Categorize
         categories = self.categorize_env_vars(existing)
         
-        category_names = {
-            'meta': 'Meta/WhatsApp Business API',
-            'google': 'Google Services (OAuth, Gmail, etc)',
-            'microsoft': 'Microsoft Services (Outlook, Azure)',
-            'openai': 'OpenAI API',
-            'anthropic': 'Anthropic/Claude API',
-            'database': 'Database Configuration',
-            'flowise': 'Flowise AI',
-            'render': 'Render Deployment',
-            'other': 'Other Configuration'
-        }
-        
-        for category, vars_dict in categories.items():
+        for category, display_name in CATEGORY_ORDER:
+            vars_dict = categories.get(category)
             if vars_dict:
-                template.append(f"\n# {category_names.get(category, category.upper())}")
-                template.append("# " + "-" * 50)
+                template.append(f"\n# {display_name}\n# {'-' * 50}")
                 
                 for key, value in sorted(vars_dict.items()):
                     # Add usage info if available
                     if key in used_vars:
                         files = used_vars[key][:3]  # Show max 3 files
-                        template.append(f"# Used in: {', '.join(files)}")
+                        usage = f"# Used in: {', '.join(files)}\n"
+                    else:
+                        usage = ""
                     
                     # Mask sensitive values
                     if value and not value.startswith('your_'):
@@ -216,8 +302,8 @@ class EnvExtractor:
                     else:
                         display_value = value or f"your_{key.lower()}"
                     
-                    template.append(f"{key}={display_value}")
-                    template.append("")
+                    # One entry per variable; the join adds the blank separator line
+                    template.append(f"{usage}{key}={display_value}\n")
         
         return "\n".join(template)
     
@@ -231,8 +317,8 @@ class EnvExtractor:
         }
         
         try:
-            with open(self.vault_path, 'w') as f:
-                json.dump(vault_data, f, indent=2)
+            with open(self.vault_path, 'wb') as f:
+                f.write(json_dumps(vault_data))
             logger.info(f"✅ Saved {len(env_vars)} variables to vault")
         except Exception as e:
             logger.error(f"❌ Error saving vault: {e}")
@@ -243,9 +329,8 @@ class EnvExtractor:
             return {}
         
         try:
-            with open(self.vault_path, 'r') as f:
-                data = json.load(f)
-                return data.get('variables', {})
+            data = json_loads(Path(self.vault_path).read_bytes())
+            return data.get('variables', {})
         except Exception as e:
             logger.error(f"❌ Error loading vault: {e}")
             return {}
@@ -262,17 +347,23 @@ class EnvExtractor:
         # Merge updates
         existing.update(updates)
         
+        parts = [f"# Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"]
+        
+        categorized = self.categorize_env_vars(existing)
+        
+        for category, _ in CATEGORY_ORDER:
+            vars_dict = categorized.get(category)
+            if not vars_dict:
+                continue
+            parts.append(f"\n# {category.upper()}\n")
+            for key, value in sorted(vars_dict.items()):
+                parts.append(f"{key}={value}\n")
+        
         try:
             with open(env_file, 'w') as f:
-                f.write(f"# Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                
-                categorized = self.categorize_env_vars(existing)
-                
-                for category, vars_dict in categorized.items():
-                    f.write(f"\n# {category.upper()}\n")
-                    for key, value in sorted(vars_dict.items()):
-                        f.write(f"{key}={value}\n")
+                f.write(''.join(parts))
             
+            self._env_cache = None
             logger.info(f"✅ Updated .env file with {len(updates)} new values")
             
         except Exception as e:
@@ -335,7 +426,7 @@ class EnvExtractor:
             logger.info(f"   {category}: {len(vars_dict)} variables")
         
         # Find unused
-        unused = set(existing.keys()) - set(used_vars.keys())
+        unused = existing.keys() - used_vars.keys()
         if unused:
             logger.info(f"\n⚠️  Potentially unused variables ({len(unused)}):")
             for var in list(unused)[:5]:
@@ -344,7 +435,7 @@ class EnvExtractor:
                 logger.info(f"   ... and {len(unused) - 5} more")
         
         # Find missing (used but not defined)
-        missing = set(used_vars.keys()) - set(existing.keys())
+        missing = used_vars.keys() - existing.keys()
         if missing:
             logger.info(f"\n❌ Missing variables ({len(missing)}):")
             for var in missing:
@@ -381,9 +472,10 @@ What would you like to do?
 4. 💾 Save current .env to vault
 5. 📋 Generate full report
 6. Exit
+7. 🔁 Refresh scan cache
 """)
         
-        choice = input("Enter choice (1-6): ").strip()
+        choice = input("Enter choice (1-7): ").strip()
         
         if choice == "1":
             used_vars = extractor.scan_for_env_vars()
@@ -417,8 +509,13 @@ What would you like to do?
         elif choice == "6":
             print("\n👋 Goodbye!")
             break
+            
+        elif choice == "7":
+            used_vars = extractor.scan_for_env_vars(force=True)
+            print(f"\n✅ Rescanned project: {len(used_vars)} variables in code")
+            
         else:
-            print("\n❌ Invalid choice. Please enter 1-6")
+            print("\n❌ Invalid choice. Please enter 1-7")
             continue
         
         input("\nPress Enter to continue...")
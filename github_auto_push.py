@@ -4,12 +4,21 @@ Automatically commits and pushes to GitHub with verification
 """
 
 import os
+import atexit
 import subprocess
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import requests
 from typing import Optional, Dict
 
+# libgit2 bindings run git operations in-process; fall back to the git CLI without them
+try:
+    import pygit2
+    GIT_ERRORS = (subprocess.CalledProcessError, pygit2.GitError, KeyError)
+except ImportError:
+    pygit2 = None
+    GIT_ERRORS = (subprocess.CalledProcessError,)
+
 class GitHubAutoPush:
     """Automates GitHub operations"""
     
@@ -18,22 +27,40 @@ class GitHubAutoPush:
         self.repo = repo
         self.token = os.getenv('GITHUB_TOKEN')
         
+        # Token remote URL is set once per instance rather than before every push
+        self._remote_configured = False
+        
+        # Built once; the lazily created session sends these on every API call
+        self._headers = {'Accept': 'application/vnd.github.v3+json'}
+        if self.token:
+            self._headers['Authorization'] = f'token {self.token}'
+        
+        # Created on first API call so git-only use never imports requests
+        self._http = None
+        
+        # url -> (ETag, parsed body); a 304 reply reuses the body without re-downloading
+        self._etag_cache: Dict[str, tuple] = {}
+        
         if not self.token:
             print("⚠️  GITHUB_TOKEN not set. Some operations may fail.")
     
     def init_repo(self) -> bool:
         """Initialize git repository if not already initialized"""
+        if pygit2:
+            return self._init_repo_in_process()
+        
         try:
             # Check if git is installed
+            # Only exit codes matter here, so output stays undecoded bytes
             result = subprocess.run(['git', '--version'], 
-                                  capture_output=True, text=True)
+                                  capture_output=True)
             if result.returncode != 0:
                 print("❌ Git is not installed. Install from https://git-scm.com/")
                 return False
             
             # Check if already a git repo
             result = subprocess.run(['git', 'rev-parse', '--git-dir'],
-                                  capture_output=True, text=True, cwd=os.getcwd())
+                                  capture_output=True, cwd=os.getcwd())
             
             if result.returncode == 0:
                 print("✅ Git repository already initialized")
@@ -59,48 +86,109 @@ class GitHubAutoPush:
             print(f"❌ Unexpected error: {e}")
             return False
     
+    def _init_repo_in_process(self) -> bool:
+        """init_repo via pygit2, without spawning git"""
+        try:
+            if pygit2.discover_repository(os.getcwd()):
+                print("✅ Git repository already initialized")
+                return True
+            
+            print("📦 Initializing git repository...")
+            repo = pygit2.init_repository(os.getcwd(), initial_head='main')
+            repo.remotes.create('origin', f"https://github.com/{self.username}/{self.repo}.git")
+            
+            print("✅ Git repository initialized")
+            return True
+            
+        except pygit2.GitError as e:
+            print(f"❌ Error initializing repo: {e}")
+            return False
+        except Exception as e:
+            print(f"❌ Unexpected error: {e}")
+            return False
+    
+    def _commit(self, message: str) -> bool:
+        """Stage everything and commit; returns False when there is nothing to commit"""
+        if pygit2:
+            repo = pygit2.Repository(pygit2.discover_repository(os.getcwd()))
+            if not repo.status():
+                return False
+            
+            print("📦 Staging changes...")
+            repo.index.add_all()
+            repo.index.write()
+            tree = repo.index.write_tree()
+            
+            parents = [] if repo.head_is_unborn else [repo.head.target]
+            if parents and repo.head.peel().tree.id == tree:
+                return False
+            
+            author = repo.default_signature
+            repo.create_commit('HEAD', author, author, message, tree, parents)
+            return True
+        
+        # Stage all changes
+        print("📦 Staging changes...")
+        subprocess.run(['git', 'add', '.'], check=True)
+        
+        # Nothing staged means nothing to commit; the exit code is locale-independent
+        if subprocess.run(['git', 'diff', '--cached', '--quiet']).returncode == 0:
+            return False
+        
+        subprocess.run(['git', 'commit', '-m', message], capture_output=True, check=True)
+        return True
+    
+    def _push(self) -> Optional[str]:
+        """Push main to origin; returns an error message on failure"""
+        if pygit2:
+            repo = pygit2.Repository(pygit2.discover_repository(os.getcwd()))
+            callbacks = None
+            if self.token:
+                # Token goes to libgit2 directly, never into the remote URL
+                callbacks = pygit2.RemoteCallbacks(
+                    credentials=pygit2.UserPass('x-access-token', self.token)
+                )
+            try:
+                repo.remotes['origin'].push(['refs/heads/main'], callbacks=callbacks)
+            except (pygit2.GitError, KeyError) as e:
+                return str(e)
+            return None
+        
+        if self.token and not self._remote_configured:
+            # Use token for authentication
+            remote_url = f"https://{self.token}@github.com/{self.username}/{self.repo}.git"
+            subprocess.run(['git', 'remote', 'set-url', 'origin', remote_url], 
+                         check=True)
+            self._remote_configured = True
+        
+        push_result = subprocess.run(
+            ['git', 'push', '-u', 'origin', 'main'],
+            capture_output=True
+        )
+        if push_result.returncode != 0:
+            return push_result.stderr.decode('utf-8', 'replace')
+        return None
+    
     def commit_and_push(self, message: Optional[str] = None) -> Dict:
         """Commit all changes and push to GitHub"""
         if not message:
             message = f"Auto-update: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         
         try:
-            # Check git status
-            status_result = subprocess.run(
-                ['git', 'status', '--porcelain'],
-                capture_output=True, text=True, check=True
-            )
-            
-            if not status_result.stdout.strip():
+            if not self._commit(message):
                 return {
                     'success': True,
                     'message': 'No changes to commit',
                     'committed': False
                 }
             
-            # Stage all changes
-            print("📦 Staging changes...")
-            subprocess.run(['git', 'add', '.'], check=True)
-            
-            # Commit
-            print(f"💾 Committing: {message}")
-            subprocess.run(['git', 'commit', '-m', message], check=True)
+            print(f"💾 Committed: {message}")
             
             # Push
             print("🚀 Pushing to GitHub...")
+            error_msg = self._push()
             
-            if self.token:
-                # Use token for authentication
-                remote_url = f"https://{self.token}@github.com/{self.username}/{self.repo}.git"
-                subprocess.run(['git', 'remote', 'set-url', 'origin', remote_url], 
-                             check=True)
-            
-            push_result = subprocess.run(
-                ['git', 'push', '-u', 'origin', 'main'],
-                capture_output=True, text=True
-            )
-            
-            if push_result.returncode == 0:
+            if error_msg is None:
                 print("✅ Successfully pushed to GitHub!")
                 return {
                     'success': True,
@@ -110,7 +198,6 @@ class GitHubAutoPush:
                     'repo_url': f"https://github.com/{self.username}/{self.repo}"
                 }
             else:
-                error_msg = push_result.stderr
                 print(f"❌ Push failed: {error_msg}")
                 return {
                     'success': False,
@@ -119,14 +206,50 @@ class GitHubAutoPush:
                     'pushed': False
                 }
             
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Git operation failed: {e}")
+        except GIT_ERRORS as e:
+            error = str(e)
+            # git commit's output is captured; show why it failed (hooks, identity)
+            stderr = getattr(e, 'stderr', None)
+            if stderr:
+                error = f"{error}\n{stderr.decode('utf-8', 'replace').strip()}"
+            print(f"❌ Git operation failed: {error}")
             return {
                 'success': False,
-                'error': str(e),
+                'error': error,
                 'committed': False
             }
     
+    @property
+    def _session(self):
+        """Keep-alive session so repeated API calls reuse one TLS connection"""
+        if self._http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            self._http = requests.Session()
+            self._http.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self._http.headers.update(self._headers)
+            atexit.register(self._http.close)
+        return self._http
+    
+    def _get_json(self, url: str):
+        """GET a GitHub API URL, revalidating cached bodies with If-None-Match"""
+        cached = self._etag_cache.get(url)
+        headers = {'If-None-Match': cached[0]} if cached else None
+        
+        response = self._session.get(url, headers=headers, timeout=10)
+        
+        if response.status_code == 304 and cached:
+            return 200, cached[1]
+        if response.status_code != 200:
+            return response.status_code, None
+        
+        data = response.json()
+        etag = response.headers.get('ETag')
+        if etag:
+            self._etag_cache[url] = (etag, data)
+        return 200, data
+    
     def verify_push(self) -> bool:
         """Verify that push was successful by checking GitHub API"""
         if not self.token:
@@ -134,16 +257,10 @@ class GitHubAutoPush:
             return False
         
         try:
-            headers = {
-                'Authorization': f'token {self.token}',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
             url = f"https://api.github.com/repos/{self.username}/{self.repo}/commits"
-            response = requests.get(url, headers=headers, timeout=10)
+            status, commits = self._get_json(url)
             
-            if response.status_code == 200:
-                commits = response.json()
+            if status == 200:
                 if commits:
                     latest = commits[0]
                     print(f"✅ Latest commit verified:")
@@ -152,7 +269,7 @@ class GitHubAutoPush:
                     print(f"   Date: {latest['commit']['author']['date']}")
                     return True
             else:
-                print(f"⚠️  Could not verify: {response.status_code}")
+                print(f"⚠️  Could not verify: {status}")
                 return False
                 
         except Exception as e:
@@ -165,16 +282,10 @@ class GitHubAutoPush:
             return {'error': 'GITHUB_TOKEN required'}
         
         try:
-            headers = {
-                'Authorization': f'token {self.token}',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
             url = f"https://api.github.com/repos/{self.username}/{self.repo}"
-            response = requests.get(url, headers=headers, timeout=10)
+            status, data = self._get_json(url)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
                 return {
                     'name': data['name'],
                     'description': data['description'],
@@ -185,11 +296,21 @@ class GitHubAutoPush:
                     'last_push': data['pushed_at']
                 }
             else:
-                return {'error': f"HTTP {response.status_code}"}
+                return {'error': f"HTTP {status}"}
                 
         except Exception as e:
             return {'error': str(e)}
     
+    def get_status_bundle(self) -> Dict:
+        """Verify the latest push and fetch repo info concurrently"""
+        # Build the shared session up front so both threads don't each create one
+        self._session
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            verified = executor.submit(self.verify_push)
+            repo_info = executor.submit(self.get_repo_info)
+            return {'verified': verified.result(), 'repo': repo_info.result()}
+    
     def create_issue(self, title: str, body: str) -> bool:
         """Create a GitHub issue (useful for error reporting)"""
         if not self.token:
@@ -197,16 +318,10 @@ class GitHubAutoPush:
             return False
         
         try:
-            headers = {
-                'Authorization': f'token {self.token}',
-                'Accept': 'application/vnd.github.v3+json',
-                'Content-Type': 'application/json'
-            }
-            
             url = f"https://api.github.com/repos/{self.username}/{self.repo}/issues"
             data = {'title': title, 'body': body}
             
-            response = requests.post(url, headers=headers, json=data, timeout=10)
+            response = self._session.post(url, json=data, timeout=10)
             
             if response.status_code == 201:
                 issue_url = response.json()['html_url']
@@ -220,27 +335,46 @@ class GitHubAutoPush:
             print(f"❌ Error creating issue: {e}")
             return False
 
+# mtime of the credentials file at the last successful backup
+BACKUP_STAMP_PATH = os.path.join(os.path.expanduser("~"), ".devops-agent", "last_backup_mtime")
+
 # Integration with DevOps Agent
 def auto_backup_credentials(vault_path: str = "credentials.json"):
     """Automatically backup credentials to GitHub"""
+    try:
+        mtime = os.stat(vault_path).st_mtime_ns
+    except OSError:
+        print(f"⚠️  {vault_path} not found")
+        return False
+    
+    # Skip git entirely when the vault is unchanged since the last backup
+    try:
+        with open(BACKUP_STAMP_PATH, 'r') as f:
+            if f.read().strip() == str(mtime):
+                print("✅ No changes since last backup")
+                return True
+    except OSError:
+        pass
+    
     github = GitHubAutoPush()
     
-    if os.path.exists(vault_path):
-        # Initialize repo
-        if not github.init_repo():
-            return False
-        
-        # Commit and push
-        result = github.commit_and_push("Auto-backup: Updated credentials")
+    # Initialize repo
+    if not github.init_repo():
+        return False
+    
+    # Commit and push
+    result = github.commit_and_push("Auto-backup: Updated credentials")
+    
+    if result['success']:
+        if result['committed']:
+            os.makedirs(os.path.dirname(BACKUP_STAMP_PATH), exist_ok=True)
+            with open(BACKUP_STAMP_PATH, 'w') as f:
+                f.write(str(mtime))
         
-        if result['success']:
-            # Verify push
-            github.verify_push()
-            return True
-        else:
-            return False
+        # Verify push
+        github.verify_push()
+        return True
     else:
-        print(f"⚠️  {vault_path} not found")
         return False
 
 # Example usage
@@ -258,8 +392,9 @@ if __name__ == "__main__":
     print("3. Verify latest push")
     print("4. Get repository info")
     print("5. Backup credentials")
+    print("6. Verify latest push + repository info")
     
-    choice = input("\nEnter choice (1-5): ").strip()
+    choice = input("\nEnter choice (1-6): ").strip()
     
     if choice == "1":
         github.init_repo()
@@ -279,4 +414,8 @@ if __name__ == "__main__":
     elif choice == "5":
         auto_backup_credentials()
     
+    elif choice == "6":
+        bundle = github.get_status_bundle()
+        print(json.dumps(bundle, indent=2))
+    
     print("\n✅ Done!")
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""
+Gunicorn settings for the WhatsApp webhook
+Used by the Procfile: gunicorn -c gunicorn.conf.py whatsapp_webhook:app
+"""
+
+import os
+
+# One async worker per process; prefork across cores (WEB_CONCURRENCY overrides)
+workers = int(os.getenv('WEB_CONCURRENCY', (os.cpu_count() or 2) * 2 + 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Keep connections from Meta / the load balancer open between deliveries
+keepalive = 75
+timeout = 30
@@ -4,18 +4,39 @@ Integrates all automation systems: DevOps, Social Media, Lead Gen, GitHub
 """
 
 import asyncio
+import functools
 import os
 import sys
 import json
 import logging
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional
 
-# Import all modules (ensure they're in same directory)
 try:
-    from devops_agent import AutomationAgent, CredentialVault
-    from social_media_automation import SocialMediaAutomation
-    from lead_scraper import LeadScraper
+    import orjson
+
+    def json_line(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    json_loads = orjson.loads
+except ImportError:
+    def json_line(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8') + b"\n"
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
+
+    json_loads = json.loads
+
+# Import all modules (ensure they're in same directory). The Playwright-based
+# workflow modules are imported inside the workflows that use them, so the
+# dashboard and push options start without loading a browser driver.
+try:
     from github_auto_push import GitHubAutoPush
 except ImportError as e:
     print(f"⚠️  Import error: {e}")
@@ -31,6 +52,95 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# One JSON object per line, so logging an activity is a single append
+ACTIVITY_LOG = 'activity_log.jsonl'
+LEGACY_ACTIVITY_LOG = 'activity_log.json'
+# Running totals kept next to the log, so the dashboard never rescans it
+ACTIVITY_STATS = 'activity_stats.json'
+
+# CLI screens, built once at import (trailing newlines match the old print() output)
+BANNER = """
+╔══════════════════════════════════════════════════════════════╗
+║  MASTER AUTOMATION CONTROLLER                                 ║
+║  Complete Business Automation System                          ║
+╚══════════════════════════════════════════════════════════════╝
+
+What would you like to do?
+
+1. 🔧 Complete Setup (All Credentials + GitHub)
+2. 📱 Create & Post Social Media Content
+3. 🎯 Find Leads & Generate Outreach
+4. 🤖 Run CrewAI + Auto-Post
+5. 📊 View Dashboard
+6. 📤 Push Everything to GitHub
+7. Exit
+
+
+"""
+
+SETUP_BANNER = """
+╔══════════════════════════════════════════════════════════════╗
+║  COMPLETE SETUP WIZARD                                        ║
+╚══════════════════════════════════════════════════════════════╝
+
+This will setup:
+1. Meta WhatsApp Business API
+2. Google Sign-In (OAuth)
+3. Microsoft Sign-In (OAuth)
+4. Generate requirements.txt
+5. Export .env file
+6. Push to GitHub
+
+Ready to start? (y/n): 
+"""
+
+CREWAI_BANNER = """
+This will:
+1. Run your CrewAI content generation
+2. Extract generated content
+3. Post to all social media platforms
+4. Push results to GitHub
+
+Note: Make sure your CrewAI project is configured properly
+
+"""
+
+DASHBOARD_BANNER = """
+╔══════════════════════════════════════════════════════════════╗
+║  ACTIVITY DASHBOARD                                           ║
+╚══════════════════════════════════════════════════════════════╝
+
+"""
+
+@functools.lru_cache(maxsize=64)
+def _base_content(topic: str) -> str:
+    """Post text for a topic, built once per topic and shared by every platform"""
+    return f"""🤖 Exciting Update!
+
+We're revolutionizing {topic} with AI-powered automation. 
+
+✨ Key benefits:
+• 24/7 availability
+• Instant responses
+• Reduced costs
+• Better customer satisfaction
+
+Want to learn more? DM us! 
+
+#AI #Automation #{topic.replace(' ', '')}"""
+
+async def ainput(prompt: str = "") -> str:
+    """input() on a worker thread, so prompts don't block the event loop"""
+    return await asyncio.to_thread(input, prompt)
+
+@functools.lru_cache(maxsize=1)
+def _load_config() -> dict:
+    """Parse config.json once per process; save_config() clears the cache"""
+    if os.path.exists('config.json'):
+        with open('config.json', 'rb') as f:
+            return json_loads(f.read())
+    return {}
+
 class MasterAutomation:
     """Master controller for all automation systems"""
     
@@ -39,19 +149,19 @@ class MasterAutomation:
         self.social_media = None
         self.lead_scraper = None
         self.github = GitHubAutoPush()
-        self.config = self.load_config()
+        self._pending_commits = []
+        self.config = _load_config()
+        self.migrate_activity_log()
     
     def load_config(self) -> dict:
         """Load configuration from config.json"""
-        if os.path.exists('config.json'):
-            with open('config.json', 'r') as f:
-                return json.load(f)
-        return {}
+        return _load_config()
     
     def save_config(self):
         """Save configuration"""
-        with open('config.json', 'w') as f:
-            json.dump(self.config, f, indent=2)
+        with open('config.json', 'wb') as f:
+            f.write(json_dumps(self.config))
+        _load_config.cache_clear()
     
     # ==================
     # WORKFLOW 1: Setup Everything
@@ -61,37 +171,26 @@ class MasterAutomation:
         """Setup all API credentials using DevOps Agent"""
         logger.info("🚀 Starting complete credential setup...")
         
+        from devops_agent import AutomationAgent
+        
         self.devops_agent = AutomationAgent(headless=False)
         await self.devops_agent.start()
         
         try:
-            print("""
-╔══════════════════════════════════════════════════════════════╗
-║  COMPLETE SETUP WIZARD                                        ║
-╚══════════════════════════════════════════════════════════════╝
-
-This will setup:
-1. Meta WhatsApp Business API
-2. Google Sign-In (OAuth)
-3. Microsoft Sign-In (OAuth)
-4. Generate requirements.txt
-5. Export .env file
-6. Push to GitHub
-
-Ready to start? (y/n): """)
+            sys.stdout.write(SETUP_BANNER)
             
-            if input().lower() != 'y':
+            if (await ainput()).lower() != 'y':
                 return
             
             # 1. Meta WhatsApp
             print("\n📱 Step 1: Meta WhatsApp Setup")
-            email = input("Facebook email: ")
-            password = input("Facebook password: ")
+            email = await ainput("Facebook email: ")
+            password = await ainput("Facebook password: ")
             await self.devops_agent.setup_meta_whatsapp(email, password)
             
             # 2. Google OAuth
             print("\n🔐 Step 2: Google OAuth Setup")
-            project = input("Google Cloud project name: ")
+            project = await ainput("Google Cloud project name: ")
             await self.devops_agent.setup_google_oauth(project)
             
             # 3. Microsoft OAuth
@@ -133,6 +232,8 @@ Ready to start? (y/n): """)
         content = self.generate_content(topic)
         
         # Post to social media
+        from social_media_automation import SocialMediaAutomation
+        
         self.social_media = SocialMediaAutomation()
         await self.social_media.start()
         
@@ -154,7 +255,7 @@ Ready to start? (y/n): """)
             self.log_activity('social_media_posts', log_entry)
             
             # Push log to GitHub
-            self.github.commit_and_push(f"Posted content: {topic}")
+            self.queue_commit(f"Posted content: {topic}")
             
         finally:
             await self.social_media.stop()
@@ -163,20 +264,7 @@ Ready to start? (y/n): """)
         """Generate content for different platforms"""
         # This is a placeholder - integrate with your CrewAI system
         # or use the content generated by your crew
-        
-        base_content = f"""🤖 Exciting Update!
-
-We're revolutionizing {topic} with AI-powered automation. 
-
-✨ Key benefits:
-• 24/7 availability
-• Instant responses
-• Reduced costs
-• Better customer satisfaction
-
-Want to learn more? DM us! 
-
-#AI #Automation #{topic.replace(' ', '')}"""
+        base_content = _base_content(topic)
         
         return {
             'twitter': {'content': base_content[:280]},
@@ -197,35 +285,21 @@ Want to learn more? DM us!
         """Find leads and prepare outreach"""
         logger.info("🎯 Starting lead generation...")
         
+        from lead_scraper import LeadScraper
+        
         self.lead_scraper = LeadScraper()
         await self.lead_scraper.start()
         
         try:
-            all_leads = []
-            
-            # LinkedIn
-            if search_params.get('linkedin_query'):
-                leads = await self.lead_scraper.scrape_linkedin_leads(
-                    search_params['linkedin_query'],
-                    max_results=50
-                )
-                all_leads.extend(leads)
-            
-            # Twitter
-            if search_params.get('twitter_hashtag'):
-                leads = await self.lead_scraper.scrape_twitter_leads(
-                    search_params['twitter_hashtag'],
-                    max_results=50
-                )
-                all_leads.extend(leads)
-            
-            # Google Maps
+            # The sources are independent, so scrape them concurrently
+            queries = {
+                'linkedin': search_params.get('linkedin_query'),
+                'twitter': search_params.get('twitter_hashtag'),
+            }
             if search_params.get('business_type') and search_params.get('location'):
-                leads = await self.lead_scraper.scrape_google_maps_businesses(
-                    search_params['business_type'],
-                    search_params['location']
-                )
-                all_leads.extend(leads)
+                queries['google_maps'] = (search_params['business_type'], search_params['location'])
+            
+            all_leads = await self.lead_scraper.scrape_all(queries, max_results=50)
             
             # Filter quality leads
             quality_keywords = search_params.get('quality_keywords', [
@@ -233,25 +307,30 @@ Want to learn more? DM us!
                 'manager', 'director', 'CEO'
             ])
             
-            quality_leads = self.lead_scraper.filter_quality_leads(quality_keywords)
+            quality_leads = await self.lead_scraper.filter_quality_leads_async(quality_keywords)
             
             # Save to CSV
             filename = self.lead_scraper.save_leads_to_csv()
             
             # Generate outreach messages
             outreach_file = f"outreach_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            rule = '=' * 60
+            blocks = []
+            for lead in quality_leads[:20]:  # Top 20 leads
+                message = self.lead_scraper.generate_outreach_message(
+                    lead,
+                    template='linkedin' if lead.platform == 'linkedin' else 'default'
+                )
+                blocks.append(
+                    f"\n{rule}\n"
+                    f"TO: {lead.name or lead.handle or 'Unknown'}\n"
+                    f"PLATFORM: {lead.platform}\n"
+                    f"{rule}\n\n"
+                    f"{message}\n\n"
+                )
+            
             with open(outreach_file, 'w', encoding='utf-8') as f:
-                for lead in quality_leads[:20]:  # Top 20 leads
-                    message = self.lead_scraper.generate_outreach_message(
-                        lead,
-                        template='linkedin' if lead['platform'] == 'linkedin' else 'default'
-                    )
-                    f.write(f"\n{'='*60}\n")
-                    f.write(f"TO: {lead.get('name', lead.get('handle', 'Unknown'))}\n")
-                    f.write(f"PLATFORM: {lead['platform']}\n")
-                    f.write(f"{'='*60}\n\n")
-                    f.write(message)
-                    f.write("\n\n")
+                f.writelines(blocks)
             
             print(f"\n✅ Found {len(all_leads)} total leads")
             print(f"✅ {len(quality_leads)} quality leads")
@@ -259,10 +338,11 @@ Want to learn more? DM us!
             print(f"✅ Outreach messages saved to: {outreach_file}")
             
             # Push to GitHub
-            self.github.commit_and_push(f"Lead generation: {len(quality_leads)} quality leads found")
+            self.queue_commit(f"Lead generation: {len(quality_leads)} quality leads found")
             
         finally:
-            await self.lead_scraper.stop()
+            # Nothing else in this run uses the browser, so shut Chromium down too
+            await self.lead_scraper.shutdown()
     
     # ==================
     # WORKFLOW 4: Integration with CrewAI
@@ -272,18 +352,10 @@ Want to learn more? DM us!
         """Run CrewAI content generation then post everywhere"""
         logger.info(f"🤖 Running CrewAI for niche: {niche}")
         
-        print("""
-This will:
-1. Run your CrewAI content generation
-2. Extract generated content
-3. Post to all social media platforms
-4. Push results to GitHub
-
-Note: Make sure your CrewAI project is configured properly
-""")
+        sys.stdout.write(CREWAI_BANNER)
         
         # Change to CrewAI project directory if needed
-        crewai_path = input("Path to CrewAI project (or press Enter if current): ").strip()
+        crewai_path = (await ainput("Path to CrewAI project (or press Enter if current): ")).strip()
         
         if crewai_path and os.path.exists(crewai_path):
             os.chdir(crewai_path)
@@ -291,17 +363,23 @@ Note: Make sure your CrewAI project is configured properly
         # Run CrewAI (this assumes you have crewai installed)
         try:
             print("🚀 Running CrewAI...")
-            os.system(f"crewai run")  # This will run your crew
+            # Crew progress streams to the terminal; stderr is kept for the error report
+            proc = await asyncio.create_subprocess_exec(
+                'crewai', 'run',
+                stderr=asyncio.subprocess.PIPE
+            )
             
-            # Wait for completion
             print("⏳ Waiting for CrewAI to complete...")
-            await asyncio.sleep(10)
+            _, stderr = await proc.communicate()
+            
+            if proc.returncode != 0:
+                print(f"❌ CrewAI exited with code {proc.returncode}")
+                if stderr:
+                    print(stderr.decode('utf-8', errors='replace')[-2000:])
+                return
             
             # Look for output file (typically report.md)
             if os.path.exists('report.md'):
-                with open('report.md', 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
                 print("✅ CrewAI completed! Content generated.")
                 
                 # Post to social media
@@ -310,6 +388,8 @@ Note: Make sure your CrewAI project is configured properly
             else:
                 print("⚠️  No output file found. Check your CrewAI configuration.")
         
+        except FileNotFoundError:
+            print("❌ crewai command not found. Install it with: pip install crewai")
         except Exception as e:
             logger.error(f"Error running CrewAI: {e}")
     
@@ -317,100 +397,149 @@ Note: Make sure your CrewAI project is configured properly
     # UTILITIES
     # ==================
     
-    def log_activity(self, activity_type: str, data: dict):
-        """Log activity to JSON file"""
-        log_file = 'activity_log.json'
+    def queue_commit(self, message: str):
+        """Record work to push; flush_commits() sends it all in one commit"""
+        self._pending_commits.append(message)
+    
+    def flush_commits(self) -> Optional[Dict]:
+        """Commit and push all queued work at once; None if nothing was queued"""
+        pending, self._pending_commits = self._pending_commits, []
+        if not pending:
+            return None
         
-        if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
+        if len(pending) == 1:
+            message = pending[0]
         else:
-            logs = []
+            message = f"Automation run: {len(pending)} updates\n\n" + "\n".join(f"- {m}" for m in pending)
+        
+        return self.github.commit_and_push(message)
+    
+    def migrate_activity_log(self):
+        """Convert an old activity_log.json array into activity_log.jsonl once"""
+        if os.path.exists(ACTIVITY_LOG) or not os.path.exists(LEGACY_ACTIVITY_LOG):
+            return
+        
+        try:
+            with open(LEGACY_ACTIVITY_LOG, 'rb') as f:
+                logs = json_loads(f.read())
+            with open(ACTIVITY_LOG, 'wb') as f:
+                f.writelines(json_line(log) for log in logs)
+            os.remove(LEGACY_ACTIVITY_LOG)
+        except Exception as e:
+            logger.error(f"Error migrating activity log: {e}")
+    
+    def rebuild_activity_stats(self) -> dict:
+        """Recount activity_stats.json from the JSONL log"""
+        counts = Counter()
+        total = 0
+        last = None
+        if os.path.exists(ACTIVITY_LOG):
+            # Stream the log so memory stays flat however long it grows
+            with open(ACTIVITY_LOG, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    last = json_loads(line)
+                    counts[last['type']] += 1
+                    total += 1
+        
+        stats = {
+            'counts': dict(counts),
+            'total': total,
+            'last_type': last['type'] if last else None,
+            'last_ts': last['timestamp'] if last else None
+        }
+        self._save_activity_stats(stats)
+        return stats
+    
+    def load_activity_stats(self) -> dict:
+        """Read the activity totals, rebuilding them if the sidecar is missing"""
+        try:
+            with open(ACTIVITY_STATS, 'rb') as f:
+                return json_loads(f.read())
+        except FileNotFoundError:
+            return self.rebuild_activity_stats()
+        except Exception as e:
+            logger.error(f"Error reading activity stats: {e}")
+            return self.rebuild_activity_stats()
+    
+    def _save_activity_stats(self, stats: dict):
+        """Write the totals via a temp file so a crash never leaves half a file"""
+        tmp_path = ACTIVITY_STATS + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(json_dumps(stats))
+        os.replace(tmp_path, ACTIVITY_STATS)
+    
+    def log_activity(self, activity_type: str, data: dict):
+        """Append activity to the JSONL log and update the running totals"""
+        # Loaded before the append, so a rebuild does not count this entry twice
+        stats = self.load_activity_stats()
+        timestamp = datetime.now().isoformat()
         
-        logs.append({
-            'type': activity_type,
-            'timestamp': datetime.now().isoformat(),
-            'data': data
-        })
+        with open(ACTIVITY_LOG, 'ab') as f:
+            f.write(json_line({
+                'type': activity_type,
+                'timestamp': timestamp,
+                'data': data
+            }))
         
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        stats['counts'][activity_type] = stats['counts'].get(activity_type, 0) + 1
+        stats['total'] += 1
+        stats['last_type'] = activity_type
+        stats['last_ts'] = timestamp
+        self._save_activity_stats(stats)
     
     def show_dashboard(self):
         """Show activity dashboard"""
-        if not os.path.exists('activity_log.json'):
+        if not os.path.exists(ACTIVITY_LOG):
             print("📊 No activity logged yet")
             return
         
-        with open('activity_log.json', 'r') as f:
-            logs = json.load(f)
-        
-        print("\n╔══════════════════════════════════════════════════════════════╗")
-        print("║  ACTIVITY DASHBOARD                                           ║")
-        print("╚══════════════════════════════════════════════════════════════╝\n")
+        stats = self.load_activity_stats()
         
-        # Count by type
-        from collections import Counter
-        counts = Counter(log['type'] for log in logs)
+        sys.stdout.write(DASHBOARD_BANNER)
         
-        for activity_type, count in counts.items():
+        for activity_type, count in stats['counts'].items():
             print(f"📊 {activity_type}: {count} activities")
         
-        print(f"\n📅 Total activities: {len(logs)}")
+        print(f"\n📅 Total activities: {stats['total']}")
         
-        if logs:
-            last = logs[-1]
-            print(f"🕐 Last activity: {last['type']} at {last['timestamp']}")
+        if stats['last_type']:
+            print(f"🕐 Last activity: {stats['last_type']} at {stats['last_ts']}")
 
 # Main CLI
 async def main():
-    print("""
-╔══════════════════════════════════════════════════════════════╗
-║  MASTER AUTOMATION CONTROLLER                                 ║
-║  Complete Business Automation System                          ║
-╚══════════════════════════════════════════════════════════════╝
-
-What would you like to do?
-
-1. 🔧 Complete Setup (All Credentials + GitHub)
-2. 📱 Create & Post Social Media Content
-3. 🎯 Find Leads & Generate Outreach
-4. 🤖 Run CrewAI + Auto-Post
-5. 📊 View Dashboard
-6. 📤 Push Everything to GitHub
-7. Exit
-
-""")
+    sys.stdout.write(BANNER)
     
     master = MasterAutomation()
     
-    choice = input("Enter choice (1-7): ").strip()
+    choice = (await ainput("Enter choice (1-7): ")).strip()
     
     if choice == "1":
         await master.setup_all_credentials()
     
     elif choice == "2":
-        topic = input("Content topic: ")
+        topic = await ainput("Content topic: ")
         await master.create_and_post_content(topic)
     
     elif choice == "3":
         search_params = {
-            'linkedin_query': input("LinkedIn search query (or press Enter to skip): ") or None,
-            'twitter_hashtag': input("Twitter hashtag (or press Enter to skip): ") or None,
-            'business_type': input("Business type for Google Maps (or press Enter to skip): ") or None,
-            'location': input("Location (or press Enter to skip): ") or None
+            'linkedin_query': await ainput("LinkedIn search query (or press Enter to skip): ") or None,
+            'twitter_hashtag': await ainput("Twitter hashtag (or press Enter to skip): ") or None,
+            'business_type': await ainput("Business type for Google Maps (or press Enter to skip): ") or None,
+            'location': await ainput("Location (or press Enter to skip): ") or None
         }
         await master.find_and_contact_leads(search_params)
     
     elif choice == "4":
-        niche = input("Enter niche for CrewAI: ")
+        niche = await ainput("Enter niche for CrewAI: ")
         await master.run_crewai_and_post(niche)
     
     elif choice == "5":
         master.show_dashboard()
     
     elif choice == "6":
-        message = input("Commit message (or press Enter for auto): ") or None
+        message = await ainput("Commit message (or press Enter for auto): ") or None
         result = master.github.commit_and_push(message)
         print(json.dumps(result, indent=2))
     
@@ -418,6 +547,9 @@ What would you like to do?
         print("👋 Goodbye!")
         return
     
+    # One push for everything the chosen workflow produced
+    master.flush_commits()
+    
     print("\n✅ Operation complete!")
 
 if __name__ == "__main__":
@@ -29,7 +29,7 @@ call venv\Scripts\activate
 
 REM Install requirements
 echo 📥 Installing dependencies...
-pip install playwright aiohttp python-dotenv requests flask authlib psycopg2-binary sqlalchemy python-dateutil pydantic colorlog gunicorn
+pip install playwright aiohttp python-dotenv requests fastapi uvicorn authlib psycopg2-binary sqlalchemy python-dateutil pydantic colorlog gunicorn
 
 REM Install Playwright browsers
 echo 🌐 Installing Playwright browsers...
@@ -132,7 +132,7 @@ echo - **OAuth**: $0 ^(unlimited^)
 
 REM Create Procfile
 echo 📝 Creating Procfile...
-echo web: gunicorn whatsapp_webhook:app > Procfile
+echo web: gunicorn -c gunicorn.conf.py whatsapp_webhook:app > Procfile
 
 echo.
 echo ╔══════════════════════════════════════════════════════════════╗
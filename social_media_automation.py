@@ -7,14 +7,52 @@ import os
 import asyncio
 import json
 import logging
+import random
+import re
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from playwright.async_api import async_playwright, Page
-import requests
+import aiohttp
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+GRAPH_API = "https://graph.facebook.com/v18.0"
+
+# Saved browser logins (cookies + local storage), kept outside the repo so the
+# auto-push never commits them
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".devops-agent", "browser_state")
+LINKEDIN_STATE_PATH = os.path.join(STATE_DIR, "linkedin_state.json")
+TWITTER_STATE_PATH = os.path.join(STATE_DIR, "twitter_state.json")
+
+# Upper bound on concurrent Graph API requests
+GRAPH_CONCURRENCY = 64
+
+# Transient Graph API failures are retried with exponential backoff
+GRAPH_MAX_ATTEMPTS = 5
+GRAPH_RETRY_STATUSES = frozenset({429, 500, 502, 503})
+GRAPH_MAX_BACKOFF = 60
+
+def _retry_delay(headers, attempt: int) -> float:
+    """Seconds to wait before retrying, honoring Meta's rate-limit headers"""
+    delay = min(2 ** attempt, GRAPH_MAX_BACKOFF) + random.uniform(0, 1)
+    
+    retry_after = headers.get('Retry-After')
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, int(retry_after))
+    
+    # {"<business_id>": [{"estimated_time_to_regain_access": <minutes>, ...}]}
+    usage = headers.get('X-Business-Use-Case-Usage')
+    if usage:
+        try:
+            for entries in json.loads(usage).values():
+                for entry in entries:
+                    delay = max(delay, entry.get('estimated_time_to_regain_access', 0) * 60)
+        except (ValueError, AttributeError):
+            pass
+    
+    return min(delay, GRAPH_MAX_BACKOFF)
+
 class SocialMediaAutomation:
     """Automates social media posting across platforms"""
     
@@ -22,6 +60,8 @@ class SocialMediaAutomation:
         self.headless = headless
         self.browser = None
         self.context = None
+        self.context_li = None
+        self.context_tw = None
         self.playwright = None
         
         # Load credentials
@@ -30,6 +70,12 @@ class SocialMediaAutomation:
         self.linkedin_password = os.getenv('LINKEDIN_PASSWORD')
         self.twitter_email = os.getenv('TWITTER_EMAIL')
         self.twitter_password = os.getenv('TWITTER_PASSWORD')
+        
+        # One keep-alive session for all Graph API calls, opened in start()
+        self._http = None
+        self._graph_limit = asyncio.BoundedSemaphore(GRAPH_CONCURRENCY)
+        self._pages_cache = None
+        self._pages_lock = asyncio.Lock()
     
     async def start(self):
         """Initialize browser"""
@@ -38,35 +84,115 @@ class SocialMediaAutomation:
         self.context = await self.browser.new_context(
             viewport={'width': 1920, 'height': 1080}
         )
+        
+        # LinkedIn and Twitter start from their saved logins when available
+        self.context_li = await self._new_context(LINKEDIN_STATE_PATH)
+        self.context_tw = await self._new_context(TWITTER_STATE_PATH)
+        self._http = aiohttp.ClientSession()
         logger.info("🚀 Browser started")
     
+    async def _new_context(self, state_path: str):
+        """Browser context restored from a saved storage_state file if one exists"""
+        return await self.browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            storage_state=state_path if os.path.exists(state_path) else None
+        )
+    
+    async def _save_state(self, context, state_path: str):
+        """Persist a context's login so the next run can skip the login flow"""
+        try:
+            os.makedirs(STATE_DIR, exist_ok=True)
+            await context.storage_state(path=state_path)
+            os.chmod(state_path, 0o600)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not save login state: {e}")
+    
     async def stop(self):
         """Cleanup"""
         if self.browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
+        if self._http:
+            await self._http.close()
+            self._http = None
         logger.info("👋 Browser closed")
     
     # =======================
     # META (Facebook/Instagram) via API
     # =======================
     
-    def post_to_facebook(self, message: str, image_url: Optional[str] = None) -> Dict:
+    async def _graph(self, method: str, url: str, **kwargs) -> Tuple[int, Dict]:
+        """
+        Send one Graph API request; returns (status, parsed JSON body)
+        GETs retry rate limits, 5xx and connection errors with backoff. Other
+        methods (page posts, media_publish) may already have taken effect after
+        a 5xx or a dropped response, so they only retry 429 and failed connects
+        """
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession()
+        
+        idempotent = method.upper() == 'GET'
+        retry_errors = (aiohttp.ClientError, asyncio.TimeoutError) if idempotent \
+            else aiohttp.ClientConnectorError
+        retry_statuses = GRAPH_RETRY_STATUSES if idempotent else frozenset({429})
+        
+        for attempt in range(GRAPH_MAX_ATTEMPTS):
+            last_attempt = attempt == GRAPH_MAX_ATTEMPTS - 1
+            try:
+                async with self._graph_limit:
+                    async with self._http.request(method, url, **kwargs) as response:
+                        status = response.status
+                        headers = response.headers
+                        retry = status in retry_statuses and not last_attempt
+                        # Edge error pages (502/503/504) are HTML, so only the
+                        # response being returned is parsed
+                        if not retry:
+                            try:
+                                body = await response.json(content_type=None)
+                            except ValueError:
+                                body = {}
+            except retry_errors as e:
+                if last_attempt:
+                    raise
+                delay = _retry_delay({}, attempt)
+                logger.warning(f"⚠️  Graph API request failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            
+            if not retry:
+                return status, body
+            
+            delay = _retry_delay(headers, attempt)
+            logger.warning(f"⚠️  Graph API returned {status}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    
+    async def _get_pages(self) -> Optional[List[Dict]]:
+        """Pages managed by the token, with page tokens and linked IG accounts (memoized)"""
+        # Facebook and Instagram posts run concurrently; fetch the list only once
+        async with self._pages_lock:
+            if self._pages_cache is None:
+                status, body = await self._graph('GET', f"{GRAPH_API}/me/accounts", params={
+                    'access_token': self.meta_token,
+                    'fields': 'id,access_token,instagram_business_account'
+                })
+                if status != 200:
+                    return None
+                self._pages_cache = body.get('data', [])
+        return self._pages_cache
+    
+    async def post_to_facebook(self, message: str, image_url: Optional[str] = None) -> Dict:
         """Post to Facebook using Meta Graph API"""
         if not self.meta_token:
             return {'success': False, 'error': 'META_ACCESS_TOKEN not set'}
         
         try:
             # Get Page ID first
-            url = "https://graph.facebook.com/v18.0/me/accounts"
-            params = {'access_token': self.meta_token}
-            response = requests.get(url, params=params)
+            pages = await self._get_pages()
             
-            if response.status_code != 200:
+            if pages is None:
                 return {'success': False, 'error': 'Failed to get page access'}
             
-            pages = response.json().get('data', [])
             if not pages:
                 return {'success': False, 'error': 'No pages found'}
             
@@ -74,7 +200,7 @@ class SocialMediaAutomation:
             page_token = pages[0]['access_token']
             
             # Post to page
-            post_url = f"https://graph.facebook.com/v18.0/{page_id}/feed"
+            post_url = f"{GRAPH_API}/{page_id}/feed"
             post_data = {
                 'message': message,
                 'access_token': page_token
@@ -83,10 +209,10 @@ class SocialMediaAutomation:
             if image_url:
                 post_data['link'] = image_url
             
-            response = requests.post(post_url, data=post_data)
+            status, body = await self._graph('POST', post_url, data=post_data)
             
-            if response.status_code == 200:
-                post_id = response.json().get('id')
+            if status == 200:
+                post_id = body.get('id')
                 logger.info(f"✅ Posted to Facebook: {post_id}")
                 return {
                     'success': True,
@@ -97,25 +223,21 @@ class SocialMediaAutomation:
             else:
                 return {
                     'success': False,
-                    'error': response.json()
+                    'error': body
                 }
         
         except Exception as e:
             logger.error(f"Facebook posting error: {e}")
             return {'success': False, 'error': str(e)}
     
-    def post_to_instagram(self, image_url: str, caption: str) -> Dict:
+    async def post_to_instagram(self, image_url: str, caption: str) -> Dict:
         """Post to Instagram using Meta Graph API"""
         if not self.meta_token:
             return {'success': False, 'error': 'META_ACCESS_TOKEN not set'}
         
         try:
             # Get Instagram Business Account ID
-            url = "https://graph.facebook.com/v18.0/me/accounts"
-            params = {'access_token': self.meta_token, 'fields': 'instagram_business_account'}
-            response = requests.get(url, params=params)
-            
-            pages = response.json().get('data', [])
+            pages = await self._get_pages() or []
             ig_account = None
             
             for page in pages:
@@ -127,31 +249,31 @@ class SocialMediaAutomation:
                 return {'success': False, 'error': 'No Instagram business account linked'}
             
             # Create media container
-            container_url = f"https://graph.facebook.com/v18.0/{ig_account}/media"
+            container_url = f"{GRAPH_API}/{ig_account}/media"
             container_data = {
                 'image_url': image_url,
                 'caption': caption,
                 'access_token': self.meta_token
             }
             
-            response = requests.post(container_url, data=container_data)
+            status, body = await self._graph('POST', container_url, data=container_data)
             
-            if response.status_code != 200:
-                return {'success': False, 'error': response.json()}
+            if status != 200:
+                return {'success': False, 'error': body}
             
-            creation_id = response.json().get('id')
+            creation_id = body.get('id')
             
             # Publish media
-            publish_url = f"https://graph.facebook.com/v18.0/{ig_account}/media_publish"
+            publish_url = f"{GRAPH_API}/{ig_account}/media_publish"
             publish_data = {
                 'creation_id': creation_id,
                 'access_token': self.meta_token
             }
             
-            response = requests.post(publish_url, data=publish_data)
+            status, body = await self._graph('POST', publish_url, data=publish_data)
             
-            if response.status_code == 200:
-                media_id = response.json().get('id')
+            if status == 200:
+                media_id = body.get('id')
                 logger.info(f"✅ Posted to Instagram: {media_id}")
                 return {
                     'success': True,
@@ -159,7 +281,7 @@ class SocialMediaAutomation:
                     'media_id': media_id
                 }
             else:
-                return {'success': False, 'error': response.json()}
+                return {'success': False, 'error': body}
         
         except Exception as e:
             logger.error(f"Instagram posting error: {e}")
@@ -169,49 +291,53 @@ class SocialMediaAutomation:
     # LINKEDIN via Browser Automation
     # =======================
     
-    async def post_to_linkedin(self, content: str, image_path: Optional[str] = None) -> Dict:
-        """Post to LinkedIn using browser automation"""
+    async def post_to_linkedin(self, content: str, image_path: Optional[str] = None,
+                               context=None) -> Dict:
+        """Post to LinkedIn using browser automation (in its own context by default)"""
         if not self.linkedin_email or not self.linkedin_password:
             return {'success': False, 'error': 'LinkedIn credentials not set'}
         
-        page = await self.context.new_page()
+        context = context or self.context_li
+        page = await context.new_page()
         
         try:
             logger.info("📘 Posting to LinkedIn...")
             
-            # Login
-            await page.goto("https://www.linkedin.com/login")
-            await page.fill('input[name="session_key"]', self.linkedin_email)
-            await page.fill('input[name="session_password"]', self.linkedin_password)
-            await page.click('button[type="submit"]')
-            
-            await asyncio.sleep(3)
-            
-            # Navigate to feed
+            # Navigate to feed; a saved session lands there without logging in
             await page.goto("https://www.linkedin.com/feed/")
-            await asyncio.sleep(2)
+            
+            if '/feed' not in page.url:
+                # Login
+                await page.goto("https://www.linkedin.com/login")
+                await page.fill('input[name="session_key"]', self.linkedin_email)
+                await page.fill('input[name="session_password"]', self.linkedin_password)
+                async with page.expect_navigation():
+                    await page.click('button[type="submit"]')
+                
+                await page.goto("https://www.linkedin.com/feed/")
+                if '/feed' in page.url:
+                    await self._save_state(context, LINKEDIN_STATE_PATH)
             
             # Click "Start a post" button
             await page.click('button:has-text("Start a post")')
-            await asyncio.sleep(1)
             
-            # Type content
-            editor = await page.locator('[role="textbox"]').first
+            # Type content once the editor is up
+            editor = page.locator('[role="textbox"]').first
+            await editor.wait_for(state='visible')
             await editor.fill(content)
             
             # Upload image if provided
             if image_path and os.path.exists(image_path):
                 # Click image upload button
                 await page.click('button[aria-label*="image"]')
-                await asyncio.sleep(1)
                 
-                # Upload file
+                # Upload file and wait for the upload request to finish
                 await page.set_input_files('input[type="file"]', image_path)
-                await asyncio.sleep(2)
+                await page.wait_for_load_state('networkidle')
             
-            # Post
+            # Post; the editor closes once LinkedIn accepts it
             await page.click('button:has-text("Post")')
-            await asyncio.sleep(3)
+            await editor.wait_for(state='hidden')
             
             logger.info("✅ Posted to LinkedIn")
             return {
@@ -230,46 +356,56 @@ class SocialMediaAutomation:
     # TWITTER/X via Browser Automation
     # =======================
     
-    async def post_to_twitter(self, content: str, image_path: Optional[str] = None) -> Dict:
-        """Post to Twitter/X using browser automation"""
+    async def post_to_twitter(self, content: str, image_path: Optional[str] = None,
+                              context=None) -> Dict:
+        """Post to Twitter/X using browser automation (in its own context by default)"""
         if not self.twitter_email or not self.twitter_password:
             return {'success': False, 'error': 'Twitter credentials not set'}
         
-        page = await self.context.new_page()
+        context = context or self.context_tw
+        page = await context.new_page()
         
         try:
             logger.info("🐦 Posting to Twitter...")
             
-            # Login
-            await page.goto("https://twitter.com/i/flow/login")
-            await asyncio.sleep(2)
-            
-            # Enter email
-            await page.fill('input[autocomplete="username"]', self.twitter_email)
-            await page.click('button:has-text("Next")')
-            await asyncio.sleep(2)
+            # A saved session opens the home timeline without logging in
+            await page.goto("https://twitter.com/home")
             
-            # Enter password
-            await page.fill('input[name="password"]', self.twitter_password)
-            await page.click('button[data-testid="LoginForm_Login_Button"]')
-            await asyncio.sleep(3)
+            if '/home' not in page.url:
+                # Login
+                await page.goto("https://twitter.com/i/flow/login")
+                await page.wait_for_selector('input[autocomplete="username"]')
+                
+                # Enter email
+                await page.fill('input[autocomplete="username"]', self.twitter_email)
+                await page.click('button:has-text("Next")')
+                await page.wait_for_selector('input[name="password"]')
+                
+                # Enter password
+                await page.fill('input[name="password"]', self.twitter_password)
+                await page.click('button[data-testid="LoginForm_Login_Button"]')
+                await page.wait_for_url(re.compile(r'/home'))
+                
+                if '/home' in page.url:
+                    await self._save_state(context, TWITTER_STATE_PATH)
             
             # Click tweet button
             await page.click('a[data-testid="SideNav_NewTweet_Button"]')
-            await asyncio.sleep(1)
             
-            # Type content
-            tweet_box = await page.locator('[data-testid="tweetTextarea_0"]').first
+            # Type content once the composer is up
+            tweet_box = page.locator('[data-testid="tweetTextarea_0"]').first
+            await tweet_box.wait_for(state='visible')
             await tweet_box.fill(content)
             
             # Upload image if provided
             if image_path and os.path.exists(image_path):
                 await page.set_input_files('input[data-testid="fileInput"]', image_path)
-                await asyncio.sleep(2)
+                await page.wait_for_selector('[data-testid="attachments"]')
             
-            # Post tweet
+            # Post tweet; Twitter confirms with a toast
+            await page.wait_for_selector('button[data-testid="tweetButtonInline"]', state='visible')
             await page.click('button[data-testid="tweetButtonInline"]')
-            await asyncio.sleep(3)
+            await page.wait_for_selector('[data-testid="toast"]')
             
             logger.info("✅ Posted to Twitter")
             return {
@@ -288,38 +424,48 @@ class SocialMediaAutomation:
     # MEDIUM via Browser Automation
     # =======================
     
-    async def post_to_medium(self, title: str, content: str, tags: List[str] = None) -> Dict:
-        """Post article to Medium"""
-        page = await self.context.new_page()
+    async def post_to_medium(self, title: str, content: str, tags: List[str] = None,
+                             context=None, content_file: Optional[str] = None) -> Dict:
+        """
+        Post article to Medium
+        content_file: read the body from this file in chunks instead of `content`,
+                      so a long report never sits in memory as one string
+        """
+        page = await (context or self.context).new_page()
         
         try:
             logger.info("📝 Posting to Medium...")
             
             await page.goto("https://medium.com/new-story")
-            await asyncio.sleep(3)
             
-            # Type title
-            title_box = await page.locator('h1[data-default-value="Title"]').first
+            # Type title once the editor is up
+            title_box = page.locator('h1[data-default-value="Title"]').first
+            await title_box.wait_for(state='visible')
             await title_box.fill(title)
             
             # Type content
-            content_box = await page.locator('[data-default-value="Tell your story..."]').first
-            await content_box.fill(content)
+            content_box = page.locator('[data-default-value="Tell your story..."]').first
+            if content_file:
+                await content_box.click()
+                with open(content_file, 'r', encoding='utf-8') as f:
+                    while chunk := f.read(MEDIUM_CHUNK_CHARS):
+                        await page.keyboard.insert_text(chunk)
+            else:
+                await content_box.fill(content)
             
             # Click publish
             await page.click('button:has-text("Publish")')
-            await asyncio.sleep(2)
+            await page.wait_for_selector('button:has-text("Publish now")', state='visible')
             
             # Add tags if provided
             if tags:
                 for tag in tags[:5]:  # Medium allows max 5 tags
                     await page.fill('input[placeholder="Add a tag..."]', tag)
                     await page.press('input[placeholder="Add a tag..."]', 'Enter')
-                    await asyncio.sleep(0.5)
             
-            # Final publish
-            await page.click('button:has-text("Publish now")')
-            await asyncio.sleep(3)
+            # Final publish; Medium navigates to the published story
+            async with page.expect_navigation():
+                await page.click('button:has-text("Publish now")')
             
             logger.info("✅ Posted to Medium")
             return {
@@ -340,73 +486,99 @@ class SocialMediaAutomation:
     # =======================
     
     async def post_to_all_platforms(self, content: Dict) -> Dict:
-        """Post content to all platforms"""
-        results = {}
+        """Post content to all platforms concurrently"""
+        tasks = {}
         
         # Facebook
         if content.get('facebook'):
-            results['facebook'] = self.post_to_facebook(
+            tasks['facebook'] = self.post_to_facebook(
                 content['facebook'].get('message', ''),
                 content['facebook'].get('image_url')
             )
         
         # Instagram
         if content.get('instagram'):
-            results['instagram'] = self.post_to_instagram(
+            tasks['instagram'] = self.post_to_instagram(
                 content['instagram'].get('image_url', ''),
                 content['instagram'].get('caption', '')
             )
         
         # LinkedIn
         if content.get('linkedin'):
-            results['linkedin'] = await self.post_to_linkedin(
+            tasks['linkedin'] = self.post_to_linkedin(
                 content['linkedin'].get('content', ''),
                 content['linkedin'].get('image_path')
             )
         
         # Twitter
         if content.get('twitter'):
-            results['twitter'] = await self.post_to_twitter(
+            tasks['twitter'] = self.post_to_twitter(
                 content['twitter'].get('content', ''),
                 content['twitter'].get('image_path')
             )
         
         # Medium
         if content.get('medium'):
-            results['medium'] = await self.post_to_medium(
+            tasks['medium'] = self.post_to_medium(
                 content['medium'].get('title', ''),
                 content['medium'].get('content', ''),
-                content['medium'].get('tags', [])
+                content['medium'].get('tags', []),
+                content_file=content['medium'].get('content_file')
             )
         
+        # LinkedIn, Twitter and Medium each post from their own context, so the
+        # browser flows share no cookies or pages and can run side by side.
+        # Total time is the slowest platform, not the sum of all of them
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        
+        results = {}
+        for platform, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"{platform} posting error: {outcome}")
+                outcome = {'success': False, 'error': str(outcome)}
+            results[platform] = outcome
+        
         return results
 
 # Integration with CrewAI
+
+# Characters of the report posted to each short-form platform
+POST_LIMITS = {
+    'twitter': 280,      # Twitter char limit
+    'linkedin': 1300,    # LinkedIn char limit
+    'facebook': 500,
+}
+
+# Characters typed into Medium's editor per insert when streaming a file
+MEDIUM_CHUNK_CHARS = 64 * 1024
+
 async def post_crew_output(output_file: str = "report.md"):
     """Post CrewAI generated content to social media"""
     if not os.path.exists(output_file):
         logger.error(f"Output file {output_file} not found")
         return
     
+    # Short-form platforms only need the start of the report
     with open(output_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+        head = f.read(max(POST_LIMITS.values()))
     
     # Parse content for different platforms
     # You can customize this based on your CrewAI output format
     
     social_content = {
         'twitter': {
-            'content': content[:280]  # Twitter char limit
+            'content': head[:POST_LIMITS['twitter']]
         },
         'linkedin': {
-            'content': content[:1300]  # LinkedIn char limit
+            'content': head[:POST_LIMITS['linkedin']]
         },
         'facebook': {
-            'message': content[:500]
+            'message': head[:POST_LIMITS['facebook']]
         },
         'medium': {
             'title': 'AI-Generated Content Report',
-            'content': content,
+            # The full article is streamed from the file into the editor
+            'content_file': output_file,
             'tags': ['AI', 'Automation', 'Technology']
         }
     }
@@ -8,32 +8,145 @@ import sys
 import json
 import asyncio
 import logging
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
+
+    json_loads = json.loads
 
 # Load environment
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+class EpochFormatter(logging.Formatter):
+    """Stamp records with their epoch seconds instead of a strftime'd date"""
+    
+    def formatTime(self, record, datefmt=None):
+        return f"{record.created:.3f}"
+
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(EpochFormatter('%(asctime)s - %(levelname)s - %(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
 logger = logging.getLogger(__name__)
 
+# (connect, read) seconds per HTTP attempt and retries per call. These bound
+# each check, since a running check thread can't be abandoned early: worst
+# case per call is (1 + REQUEST_RETRIES) * (3 + 4)s, about 14s, and Meta's two
+# calls run side by side, so no check takes longer than that
+REQUEST_TIMEOUT = (3, 4)
+REQUEST_RETRIES = 1
+
+# Message templates change rarely, so a recent listing is reused between runs
+TEMPLATE_CACHE_PATH = Path('.cache') / 'meta_templates.json'
+TEMPLATE_CACHE_TTL = 6 * 3600
+
+# Report marker for each check status
+STATUS_EMOJI = {
+    'success': '✅',
+    'valid_format': '✓',
+    'failed': '❌',
+    'error': '⚠️',
+    'skipped': '⏭️',
+    'not_configured': '⚠️',
+    'ready': '✅'
+}
+
+# Every environment variable the checks read
+ENV_VARS = (
+    'META_ACCESS_TOKEN', 'META_PHONE_NUMBER_ID', 'META_APP_ID', 'META_VERIFY_TOKEN', 'META_PORT',
+    'GOOGLE_OAUTH_CLIENT_ID', 'GOOGLE_OAUTH_CLIENT_SECRET',
+    'MICROSOFT_OAUTH_CLIENT_ID', 'MICROSOFT_OAUTH_CLIENT_SECRET',
+    'FLOWISE_API_KEY', 'FLOWISE_URL'
+)
+
 class CredentialTester:
     """Test all service credentials"""
     
     def __init__(self):
         self.results = {}
+        # Read the environment once, not in every check
+        self._env = {name: os.getenv(name) for name in ENV_VARS}
+        
+        # One pooled session, so calls to the same host reuse the TLS connection;
+        # GETs retry transient gateway errors and rate limits on that connection.
+        # POSTs are not in allowed_methods, so urllib3 only retries their failed
+        # connects, never a request the server may already have acted on
+        self.session = requests.Session()
+        retry = Retry(
+            total=REQUEST_RETRIES,
+            backoff_factor=0.1,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False  # hand the last response to the check as before
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+        
+    def _cached_templates(self, app_id: str):
+        """Templates from the last run if still fresh for this app, else None"""
+        try:
+            if time.time() - TEMPLATE_CACHE_PATH.stat().st_mtime >= TEMPLATE_CACHE_TTL:
+                return None
+            cached = json_loads(TEMPLATE_CACHE_PATH.read_bytes())
+        except (OSError, ValueError):
+            return None
+        return cached['data'] if cached.get('app_id') == app_id else None
+    
+    def _save_templates(self, app_id: str, templates: list):
+        """Remember the template listing for TEMPLATE_CACHE_TTL"""
+        try:
+            TEMPLATE_CACHE_PATH.parent.mkdir(exist_ok=True)
+            TEMPLATE_CACHE_PATH.write_bytes(json_dumps({'app_id': app_id, 'data': templates}))
+        except OSError as e:
+            logger.warning("⚠️  Could not cache templates: %s", e)
+    
+    def _fetch_templates(self, app_id: str, headers: dict):
+        """GET the app's message templates and cache them; None if the call fails"""
+        try:
+            template_url = f"https://graph.facebook.com/v18.0/{app_id}/message_templates"
+            template_resp = self.session.get(template_url, headers=headers, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            logger.warning("⚠️  Could not list templates: %s", e)
+            return None
         
+        # Only a successful listing is cached; failures refetch next run
+        if template_resp.status_code != 200:
+            return None
+        try:
+            templates = template_resp.json().get('data', [])
+        except ValueError as e:
+            logger.warning("⚠️  Template listing was not JSON: %s", e)
+            return None
+        self._save_templates(app_id, templates)
+        return templates
+    
     def test_meta_whatsapp(self):
         """Test Meta WhatsApp credentials"""
         logger.info("📱 Testing Meta WhatsApp credentials...")
         
-        access_token = os.getenv('META_ACCESS_TOKEN')
-        phone_id = os.getenv('META_PHONE_NUMBER_ID')
-        app_id = os.getenv('META_APP_ID')
+        access_token = self._env['META_ACCESS_TOKEN']
+        phone_id = self._env['META_PHONE_NUMBER_ID']
+        app_id = self._env['META_APP_ID']
         
         if not access_token or not phone_id:
             self.results['meta'] = {
@@ -48,7 +161,17 @@ class CredentialTester:
             url = f"https://graph.facebook.com/v18.0/{phone_id}"
             headers = {'Authorization': f'Bearer {access_token}'}
             
-            response = requests.get(url, headers=headers)
+            # The template listing only needs the app ID, so fetch it alongside the
+            # phone lookup instead of after it
+            templates = self._cached_templates(app_id) if app_id else None
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                template_future = None
+                if app_id and templates is None:
+                    template_future = pool.submit(self._fetch_templates, app_id, headers)
+                
+                response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+                if template_future is not None:
+                    templates = template_future.result()
             
             if response.status_code == 200:
                 data = response.json()
@@ -58,18 +181,14 @@ class CredentialTester:
                     'verified': data.get('verified_name'),
                     'quality': data.get('quality_rating')
                 }
-                logger.info(f"✅ Meta WhatsApp: {data.get('display_phone_number')}")
-                logger.info(f"   Quality rating: {data.get('quality_rating')}")
+                logger.info("✅ Meta WhatsApp: %s", data.get('display_phone_number'))
+                logger.info("   Quality rating: %s", data.get('quality_rating'))
                 
                 # Test 2: Check message templates
-                template_url = f"https://graph.facebook.com/v18.0/{app_id}/message_templates"
-                template_resp = requests.get(template_url, headers=headers)
-                
-                if template_resp.status_code == 200:
-                    templates = template_resp.json().get('data', [])
-                    logger.info(f"   Templates available: {len(templates)}")
+                if templates is not None:
+                    logger.info("   Templates available: %s", len(templates))
                     for tmpl in templates[:3]:
-                        logger.info(f"      - {tmpl.get('name')} ({tmpl.get('status')})")
+                        logger.info("      - %s (%s)", tmpl.get('name'), tmpl.get('status'))
                 
             elif response.status_code == 401:
                 self.results['meta'] = {
@@ -77,6 +196,8 @@ class CredentialTester:
                     'reason': 'Invalid access token'
                 }
                 logger.error("❌ Access token invalid or expired")
+                # Listings fetched with the old token can't be trusted any more
+                TEMPLATE_CACHE_PATH.unlink(missing_ok=True)
                 logger.info("💡 Generate new token via DevOps Agent")
                 
             else:
@@ -84,22 +205,22 @@ class CredentialTester:
                     'status': 'failed',
                     'reason': f'API error: {response.status_code}'
                 }
-                logger.error(f"❌ API returned {response.status_code}")
-                logger.error(f"   Response: {response.text}")
+                logger.error("❌ API returned %s", response.status_code)
+                logger.error("   Response: %s", response.text)
                 
         except Exception as e:
             self.results['meta'] = {
                 'status': 'error',
                 'reason': str(e)
             }
-            logger.error(f"❌ Error testing Meta: {e}")
+            logger.error("❌ Error testing Meta: %s", e)
     
     def test_google_oauth(self):
         """Test Google OAuth credentials"""
         logger.info("🔐 Testing Google OAuth credentials...")
         
-        client_id = os.getenv('GOOGLE_OAUTH_CLIENT_ID')
-        client_secret = os.getenv('GOOGLE_OAUTH_CLIENT_SECRET')
+        client_id = self._env['GOOGLE_OAUTH_CLIENT_ID']
+        client_secret = self._env['GOOGLE_OAUTH_CLIENT_SECRET']
         
         if not client_id or not client_secret:
             self.results['google'] = {
@@ -118,7 +239,7 @@ class CredentialTester:
                     'note': 'Cannot fully test without user auth flow'
                 }
                 logger.info("✅ Google OAuth: Valid format")
-                logger.info(f"   Client ID: {client_id[:30]}...")
+                logger.info("   Client ID: %s...", client_id[:30])
                 logger.info("   ℹ️  Full test requires user authentication")
             else:
                 self.results['google'] = {
@@ -132,14 +253,14 @@ class CredentialTester:
                 'status': 'error',
                 'reason': str(e)
             }
-            logger.error(f"❌ Error: {e}")
+            logger.error("❌ Error: %s", e)
     
     def test_microsoft_oauth(self):
         """Test Microsoft OAuth credentials"""
         logger.info("🔐 Testing Microsoft OAuth credentials...")
         
-        client_id = os.getenv('MICROSOFT_OAUTH_CLIENT_ID')
-        client_secret = os.getenv('MICROSOFT_OAUTH_CLIENT_SECRET')
+        client_id = self._env['MICROSOFT_OAUTH_CLIENT_ID']
+        client_secret = self._env['MICROSOFT_OAUTH_CLIENT_SECRET']
         
         if not client_id or not client_secret:
             self.results['microsoft'] = {
@@ -154,7 +275,8 @@ class CredentialTester:
             url = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
             
             # This will fail but confirms endpoint is reachable
-            response = requests.post(url, data={'grant_type': 'client_credentials'})
+            response = self.session.post(url, data={'grant_type': 'client_credentials'},
+                                         timeout=REQUEST_TIMEOUT)
             
             if response.status_code in [400, 401]:
                 # Expected - means endpoint is working, we just need valid flow
@@ -164,7 +286,7 @@ class CredentialTester:
                     'note': 'Credentials format valid, cannot fully test without user auth'
                 }
                 logger.info("✅ Microsoft OAuth: Valid format")
-                logger.info(f"   Client ID: {client_id[:20]}...")
+                logger.info("   Client ID: %s...", client_id[:20])
                 logger.info("   ℹ️  Full test requires user authentication")
             else:
                 self.results['microsoft'] = {
@@ -177,14 +299,14 @@ class CredentialTester:
                 'status': 'error',
                 'reason': str(e)
             }
-            logger.error(f"❌ Error: {e}")
+            logger.error("❌ Error: %s", e)
     
     def test_flowise(self):
         """Test Flowise connection"""
         logger.info("🤖 Testing Flowise connection...")
         
-        api_key = os.getenv('FLOWISE_API_KEY')
-        url = os.getenv('FLOWISE_URL', 'http://localhost:3000')
+        api_key = self._env['FLOWISE_API_KEY']
+        url = self._env['FLOWISE_URL'] or 'http://localhost:3000'
         
         if not api_key:
             self.results['flowise'] = {
@@ -196,9 +318,10 @@ class CredentialTester:
         
         try:
             # Test API endpoint
-            response = requests.get(
+            response = self.session.get(
                 f"{url}/api/v1/chatflows",
-                headers={'Authorization': f'Bearer {api_key}'}
+                headers={'Authorization': f'Bearer {api_key}'},
+                timeout=REQUEST_TIMEOUT
             )
             
             if response.status_code == 200:
@@ -208,34 +331,34 @@ class CredentialTester:
                     'url': url,
                     'chatflows': len(flows)
                 }
-                logger.info(f"✅ Flowise connected: {url}")
-                logger.info(f"   Chatflows available: {len(flows)}")
+                logger.info("✅ Flowise connected: %s", url)
+                logger.info("   Chatflows available: %s", len(flows))
             else:
                 self.results['flowise'] = {
                     'status': 'failed',
                     'code': response.status_code
                 }
-                logger.error(f"❌ Connection failed: {response.status_code}")
+                logger.error("❌ Connection failed: %s", response.status_code)
                 
         except requests.exceptions.ConnectionError:
             self.results['flowise'] = {
                 'status': 'unreachable',
                 'url': url
             }
-            logger.error(f"❌ Cannot reach Flowise at {url}")
+            logger.error("❌ Cannot reach Flowise at %s", url)
         except Exception as e:
             self.results['flowise'] = {
                 'status': 'error',
                 'reason': str(e)
             }
-            logger.error(f"❌ Error: {e}")
+            logger.error("❌ Error: %s", e)
     
     def test_webhook_readiness(self):
         """Check if webhook server can start"""
         logger.info("🔍 Checking webhook readiness...")
         
-        port = os.getenv('META_PORT', '3000')
-        verify_token = os.getenv('META_VERIFY_TOKEN')
+        port = self._env['META_PORT'] or '3000'
+        verify_token = self._env['META_VERIFY_TOKEN']
         
         if not verify_token:
             self.results['webhook'] = {
@@ -250,65 +373,90 @@ class CredentialTester:
             'port': port,
             'verify_token': verify_token[:20] + '...'
         }
-        logger.info(f"✅ Webhook ready to start on port {port}")
-        logger.info(f"   Verify token: {verify_token[:20]}...")
+        logger.info("✅ Webhook ready to start on port %s", port)
+        logger.info("   Verify token: %s...", verify_token[:20])
+    
+    def run_all(self):
+        """Run every check at once; each writes its own key in self.results"""
+        checks = {
+            'meta': self.test_meta_whatsapp,
+            'google': self.test_google_oauth,
+            'microsoft': self.test_microsoft_oauth,
+            'flowise': self.test_flowise,
+            'webhook': self.test_webhook_readiness
+        }
+        
+        # Every check finishes within its request timeouts, so waiting for all of
+        # them takes as long as the slowest check
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = {service: executor.submit(check) for service, check in checks.items()}
+            
+            for service, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    self.results[service] = {
+                        'status': 'error',
+                        'reason': str(e)
+                    }
+                    logger.error("❌ %s check crashed: %s", service, e)
+        
+        # Report in the usual order rather than the order checks finished
+        self.results = {service: self.results[service] for service in checks if service in self.results}
     
     def generate_report(self):
         """Generate comprehensive test report"""
-        print("\n" + "="*70)
-        print("CREDENTIAL TEST REPORT")
-        print("="*70)
-        print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("="*70 + "\n")
+        rule = "=" * 70
+        out = [
+            f"\n{rule}\n",
+            "CREDENTIAL TEST REPORT\n",
+            f"{rule}\n",
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"{rule}\n\n"
+        ]
         
         for service, result in self.results.items():
-            status_emoji = {
-                'success': '✅',
-                'valid_format': '✓',
-                'failed': '❌',
-                'error': '⚠️',
-                'skipped': '⏭️',
-                'not_configured': '⚠️',
-                'ready': '✅'
-            }.get(result.get('status'), '❓')
+            status_emoji = STATUS_EMOJI.get(result.get('status'), '❓')
             
-            print(f"{status_emoji} {service.upper()}")
-            print(f"   Status: {result.get('status')}")
+            out.append(f"{status_emoji} {service.upper()}\n")
+            out.append(f"   Status: {result.get('status')}\n")
             
             for key, value in result.items():
                 if key != 'status':
-                    print(f"   {key}: {value}")
-            print()
+                    out.append(f"   {key}: {value}\n")
+            out.append("\n")
         
-        print("="*70)
+        out.append(f"{rule}\n")
         
         # Count successes
         successful = sum(1 for r in self.results.values() 
                         if r.get('status') in ['success', 'valid_format', 'ready'])
         total = len(self.results)
         
-        print(f"\n✅ {successful}/{total} services tested successfully")
+        out.append(f"\n✅ {successful}/{total} services tested successfully\n")
         
         # Recommendations
-        print("\n💡 RECOMMENDATIONS:\n")
+        out.append("\n💡 RECOMMENDATIONS:\n\n")
         
         for service, result in self.results.items():
             if result.get('status') == 'failed':
                 if service == 'meta':
-                    print(f"   • Re-run DevOps Agent to refresh Meta credentials")
-                    print(f"     python devops_agent.py → Option 1")
+                    out.append("   • Re-run DevOps Agent to refresh Meta credentials\n")
+                    out.append("     python devops_agent.py → Option 1\n")
             
             if result.get('status') == 'not_configured':
-                print(f"   • Configure {service} via DevOps Agent")
+                out.append(f"   • Configure {service} via DevOps Agent\n")
         
-        print()
+        out.append("\n")
+        
+        # The whole report in one write
+        sys.stdout.write(''.join(out))
         
         # Save report
-        with open('test_report.json', 'w') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'results': self.results
-            }, f, indent=2)
+        Path('test_report.json').write_bytes(json_dumps({
+            'timestamp': datetime.now().isoformat(),
+            'results': self.results
+        }))
         
         logger.info("📄 Report saved to test_report.json")
 
@@ -330,22 +478,12 @@ def main():
     
     print("🧪 Running tests...\n")
     
-    tester.test_meta_whatsapp()
-    print()
-    
-    tester.test_google_oauth()
-    print()
-    
-    tester.test_microsoft_oauth()
-    print()
-    
-    tester.test_flowise()
-    print()
-    
-    tester.test_webhook_readiness()
+    # The checks are independent, so total time is the slowest check, not the sum
+    tester.run_all()
     print()
     
     tester.generate_report()
+    tester.close()
     
     print("\n✅ Testing complete!")
     print("   Review test_report.json for details")
@@ -4,24 +4,47 @@ Uses credentials extracted by DevOps Agent
 """
 
 import os
+import json
+import asyncio
 import logging
-from flask import Flask, request, jsonify
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, Response
 from dotenv import load_dotenv
-import requests
+import aiohttp
 import hmac
 import hashlib
+import time
+from collections import OrderedDict
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as JSONResponse
+
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    from fastapi.responses import JSONResponse
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+    json_loads = json.loads
 
 # Load environment variables
 load_dotenv()
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+class EpochFormatter(logging.Formatter):
+    """Stamp records with their epoch seconds instead of a strftime'd date"""
+    
+    def formatTime(self, record, datefmt=None):
+        return f"{record.created:.3f}"
 
-app = Flask(__name__)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(EpochFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
+logger = logging.getLogger(__name__)
 
 # Load Meta credentials (auto-extracted by agent)
 META_ACCESS_TOKEN = os.getenv('META_ACCESS_TOKEN')
@@ -29,53 +52,167 @@ META_APP_SECRET = os.getenv('META_APP_SECRET')
 META_VERIFY_TOKEN = os.getenv('META_VERIFY_TOKEN')
 META_PHONE_NUMBER_ID = os.getenv('META_PHONE_NUMBER_ID')
 WEBHOOK_PORT = int(os.getenv('META_PORT', 3000))
+# Encoded once; verify_signature needs bytes on every request
+_APP_SECRET_BYTES = META_APP_SECRET.encode() if META_APP_SECRET else b''
+_VERIFY_TOKEN_BYTES = META_VERIFY_TOKEN.encode() if META_VERIFY_TOKEN else b''
+
+GRAPH_API = "https://graph.facebook.com/v18.0"
+# Keep idle Graph API connections open across bursts of webhook traffic
+# (aiohttp closes them after 15s by default), so replies skip the TLS handshake
+KEEPALIVE_TIMEOUT = 75
+
+# Every outbound message goes to the same endpoint with the same headers
+_SEND_URL = f"{GRAPH_API}/{META_PHONE_NUMBER_ID}/messages"
+_SEND_HEADERS = {
+    'Authorization': f'Bearer {META_ACCESS_TOKEN}',
+    'Content-Type': 'application/json'
+}
+
+# Sends are retried only when Meta can't have accepted the message: a rate
+# limit, or a connection that never opened. A 5xx or a dropped response may
+# follow a delivered message, and retrying those would message the user twice
+SEND_MAX_ATTEMPTS = 3
+SEND_RETRY_STATUSES = frozenset({429})
+SEND_BACKOFF = 0.1
+
+# Recently verified signatures, so Meta's retried deliveries skip the HMAC
+SIGNATURE_CACHE_TTL = 120
+SIGNATURE_CACHE_SIZE = 256
+_sig_cache = OrderedDict()  # signature -> (payload digest, expires at)
+
+# Replies are sent after Meta gets its 200. Replies queued within one
+# BATCH_WINDOW are coalesced and sent concurrently over the shared pool
+OUTBOX_SIZE = 10000
+BATCH_WINDOW = 0.025
+BATCH_SIZE = 100
+# Seconds to finish queued replies on shutdown before dropping them
+OUTBOX_DRAIN_TIMEOUT = 5
 
 # Validate required env vars
 required_vars = ['META_ACCESS_TOKEN', 'META_VERIFY_TOKEN', 'META_PHONE_NUMBER_ID']
 missing = [var for var in required_vars if not os.getenv(var)]
 if missing:
-    logger.error(f"❌ Missing required environment variables: {missing}")
+    logger.error("❌ Missing required environment variables: %s", missing)
     logger.info("Run the DevOps Agent to extract these credentials!")
     exit(1)
 
-@app.route('/webhook', methods=['GET'])
-def verify_webhook():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """One keep-alive connection pool to the Graph API for the worker's lifetime"""
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=20,
+            keepalive_timeout=KEEPALIVE_TIMEOUT
+        ),
+        timeout=aiohttp.ClientTimeout(total=10)
+    )
+    # Open the first connection in the background, before the first reply needs it
+    warmup = asyncio.create_task(warm_up_connection(app.state.http))
+    
+    app.state.outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+    flusher = asyncio.create_task(outbox_flusher(app.state.outbox))
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        try:
+            await asyncio.wait_for(app.state.outbox.join(), OUTBOX_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Dropping %s unsent replies on shutdown", app.state.outbox.qsize())
+        flusher.cancel()
+        await app.state.http.close()
+
+async def warm_up_connection(http: aiohttp.ClientSession):
+    """Pay the DNS + TLS cost to graph.facebook.com once, at startup"""
+    try:
+        async with http.get(
+            f"{GRAPH_API}/{META_PHONE_NUMBER_ID}",
+            headers={'Authorization': f'Bearer {META_ACCESS_TOKEN}'},
+            timeout=aiohttp.ClientTimeout(total=3)
+        ) as response:
+            await response.read()
+            logger.info("🔥 Graph API connection warmed up (%s)", response.status)
+    except Exception as e:
+        logger.warning("⚠️ Graph API warmup failed: %s", e)
+
+async def send_batch(outbox: asyncio.Queue, batch):
+    """Send a batch of replies at once; send_message logs its own failures"""
+    try:
+        await asyncio.gather(*(send_message(to, text) for to, text in batch), return_exceptions=True)
+    finally:
+        for _ in batch:
+            outbox.task_done()
+
+async def outbox_flusher(outbox: asyncio.Queue):
+    """Collect replies for BATCH_WINDOW, then hand the batch off and keep collecting"""
+    in_flight = set()
+    while True:
+        batch = [await outbox.get()]
+        await asyncio.sleep(BATCH_WINDOW)
+        while len(batch) < BATCH_SIZE and not outbox.empty():
+            batch.append(outbox.get_nowait())
+        
+        # A slow batch must not hold up the next one
+        task = asyncio.create_task(send_batch(outbox, batch))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+def queue_reply(to, text):
+    """Queue a reply so the webhook can acknowledge Meta right away"""
+    try:
+        app.state.outbox.put_nowait((to, text))
+    except asyncio.QueueFull:
+        logger.error("❌ Outbox full, dropping reply to %s", to)
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get('/webhook')
+async def verify_webhook(request: Request):
     """
     Webhook verification endpoint
     Meta calls this to verify your webhook URL
     """
     try:
-        mode = request.args.get('hub.mode')
-        token = request.args.get('hub.verify_token')
-        challenge = request.args.get('hub.challenge')
+        mode = request.query_params.get('hub.mode')
+        token = request.query_params.get('hub.verify_token')
+        challenge = request.query_params.get('hub.challenge')
         
-        logger.info(f"🔍 Webhook verification attempt - Mode: {mode}")
+        logger.info("🔍 Webhook verification attempt - Mode: %s", mode)
         
-        if mode == 'subscribe' and token == META_VERIFY_TOKEN:
+        # Scanners and probes usually send none of these; reject before comparing
+        if mode != 'subscribe' or token is None or challenge is None:
+            logger.warning("❌ Verification failed - incomplete request")
+            return PlainTextResponse('Verification failed', status_code=403)
+        
+        # Constant-time compare, so the token can't be guessed from response times
+        if hmac.compare_digest(token.encode(), _VERIFY_TOKEN_BYTES):
             logger.info("✅ Webhook verified successfully!")
-            return challenge, 200
+            return PlainTextResponse(challenge, status_code=200)
         else:
             logger.warning("❌ Verification failed - token mismatch")
-            return 'Verification failed', 403
+            return PlainTextResponse('Verification failed', status_code=403)
             
     except Exception as e:
-        logger.error(f"Verification error: {e}")
-        return 'Error', 500
+        logger.error("Verification error: %s", e)
+        return PlainTextResponse('Error', status_code=500)
 
-@app.route('/webhook', methods=['POST'])
-def webhook():
+@app.post('/webhook')
+async def webhook(request: Request):
     """
     Main webhook endpoint for receiving WhatsApp messages
     """
     try:
         # Verify request signature
         signature = request.headers.get('X-Hub-Signature-256', '')
-        if not verify_signature(request.get_data(), signature):
+        # Parse the exact bytes that were verified, not a second decode of the body
+        payload = await request.body()
+        if not verify_signature(payload, signature):
             logger.warning("⚠️ Invalid signature - possible unauthorized request")
-            return 'Invalid signature', 403
+            return PlainTextResponse('Invalid signature', status_code=403)
         
-        data = request.get_json()
-        logger.info(f"📨 Received webhook data")
+        data = json_loads(payload)
+        logger.info("📨 Received webhook data")
         
         # Process incoming messages
         if 'entry' in data:
@@ -91,26 +228,42 @@ def webhook():
                     # Handle message status updates
                     if 'statuses' in value:
                         for status in value['statuses']:
-                            logger.info(f"📊 Message status: {status.get('status')}")
+                            logger.info("📊 Message status: %s", status.get('status'))
         
-        return jsonify({'status': 'success'}), 200
+        return JSONResponse({'status': 'success'}, status_code=200)
         
     except Exception as e:
-        logger.error(f"❌ Webhook error: {e}", exc_info=True)
-        return jsonify({'error': str(e)}), 500
+        logger.error("❌ Webhook error: %s", e, exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
 
 def verify_signature(payload, signature):
     """Verify webhook request is from Meta"""
     if not META_APP_SECRET:
         return True  # Skip verification if no secret (dev mode)
     
-    expected = hmac.new(
-        META_APP_SECRET.encode(),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
+    now = time.monotonic()
+    digest = hashlib.blake2b(payload, digest_size=16).digest()
+    cached = _sig_cache.get(signature)
+    if cached and cached[1] > now and hmac.compare_digest(cached[0], digest):
+        return True
+    
+    # Compare raw digests: decode the header once instead of hex-encoding ours
+    if not signature.startswith('sha256='):
+        return False
+    try:
+        received = bytes.fromhex(signature[7:])
+    except ValueError:
+        return False
+    
+    expected = hmac.new(_APP_SECRET_BYTES, payload, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, received):
+        return False
     
-    return hmac.compare_digest(f"sha256={expected}", signature)
+    _sig_cache[signature] = (digest, now + SIGNATURE_CACHE_TTL)
+    _sig_cache.move_to_end(signature)
+    while len(_sig_cache) > SIGNATURE_CACHE_SIZE:
+        _sig_cache.popitem(last=False)
+    return True
 
 def process_message(message, value):
     """Process incoming WhatsApp message"""
@@ -118,49 +271,64 @@ def process_message(message, value):
         sender = message.get('from')
         message_type = message.get('type')
         
-        logger.info(f"💬 New {message_type} message from {sender}")
+        logger.info("💬 New %s message from %s", message_type, sender)
         
         # Handle text messages
         if message_type == 'text':
             text = message.get('text', {}).get('body', '')
-            logger.info(f"   Text: {text}")
+            logger.info("   Text: %s", text)
             
             # Echo back the message
             reply = f"You said: {text}"
-            send_message(sender, reply)
+            queue_reply(sender, reply)
         
         # Handle image messages
         elif message_type == 'image':
             image_id = message.get('image', {}).get('id')
             caption = message.get('image', {}).get('caption', '')
-            logger.info(f"   Image ID: {image_id}, Caption: {caption}")
-            send_message(sender, "Got your image! 📸")
+            logger.info("   Image ID: %s, Caption: %s", image_id, caption)
+            queue_reply(sender, "Got your image! 📸")
         
         # Handle location messages
         elif message_type == 'location':
             lat = message.get('location', {}).get('latitude')
             lon = message.get('location', {}).get('longitude')
-            logger.info(f"   Location: {lat}, {lon}")
-            send_message(sender, "Thanks for sharing your location! 📍")
+            logger.info("   Location: %s, %s", lat, lon)
+            queue_reply(sender, "Thanks for sharing your location! 📍")
         
         # Handle interactive messages (buttons, lists)
         elif message_type == 'interactive':
             interactive_type = message.get('interactive', {}).get('type')
-            logger.info(f"   Interactive: {interactive_type}")
+            logger.info("   Interactive: %s", interactive_type)
         
     except Exception as e:
-        logger.error(f"Error processing message: {e}")
+        logger.error("Error processing message: %s", e)
 
-def send_message(to, text):
-    """Send WhatsApp message"""
-    try:
-        url = f"https://graph.facebook.com/v18.0/{META_PHONE_NUMBER_ID}/messages"
+async def post_message(payload: dict):
+    """POST one message to the Graph API, retrying rate limits and failed connects; returns (status, text)"""
+    body = json_dumps(payload)
+    for attempt in range(SEND_MAX_ATTEMPTS):
+        last_attempt = attempt == SEND_MAX_ATTEMPTS - 1
+        try:
+            async with app.state.http.post(_SEND_URL, headers=_SEND_HEADERS, data=body) as response:
+                status = response.status
+                text = await response.text()
+        except aiohttp.ClientConnectorError as e:
+            if last_attempt:
+                raise
+            logger.warning("⚠️ Could not connect (%s), retrying", e)
+            await asyncio.sleep(SEND_BACKOFF * 2 ** attempt)
+            continue
         
-        headers = {
-            'Authorization': f'Bearer {META_ACCESS_TOKEN}',
-            'Content-Type': 'application/json'
-        }
+        if status not in SEND_RETRY_STATUSES or last_attempt:
+            return status, text
         
+        logger.warning("⚠️ Graph API returned %s, retrying", status)
+        await asyncio.sleep(SEND_BACKOFF * 2 ** attempt)
+
+async def send_message(to, text):
+    """Send WhatsApp message"""
+    try:
         payload = {
             'messaging_product': 'whatsapp',
             'to': to,
@@ -168,26 +336,18 @@ def send_message(to, text):
             'text': {'body': text}
         }
         
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code == 200:
-            logger.info(f"✅ Message sent to {to}")
+        status, body = await post_message(payload)
+        if status == 200:
+            logger.info("✅ Message sent to %s", to)
         else:
-            logger.error(f"❌ Failed to send: {response.status_code} - {response.text}")
+            logger.error("❌ Failed to send: %s - %s", status, body)
             
     except Exception as e:
-        logger.error(f"Error sending message: {e}")
+        logger.error("Error sending message: %s", e)
 
-def send_template(to, template_name, language='en'):
+async def send_template(to, template_name, language='en'):
     """Send WhatsApp template message"""
     try:
-        url = f"https://graph.facebook.com/v18.0/{META_PHONE_NUMBER_ID}/messages"
-        
-        headers = {
-            'Authorization': f'Bearer {META_ACCESS_TOKEN}',
-            'Content-Type': 'application/json'
-        }
-        
         payload = {
             'messaging_product': 'whatsapp',
             'to': to,
@@ -198,22 +358,21 @@ def send_template(to, template_name, language='en'):
             }
         }
         
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code == 200:
-            logger.info(f"✅ Template sent to {to}")
+        status, body = await post_message(payload)
+        if status == 200:
+            logger.info("✅ Template sent to %s", to)
         else:
-            logger.error(f"❌ Failed: {response.status_code} - {response.text}")
+            logger.error("❌ Failed: %s - %s", status, body)
             
     except Exception as e:
-        logger.error(f"Error sending template: {e}")
+        logger.error("Error sending template: %s", e)
 
-def send_interactive_buttons(to, body_text, buttons):
+async def send_interactive_buttons(to, body_text, buttons):
     """
     Send interactive message with buttons
     
     Example:
-    send_interactive_buttons(
+    await send_interactive_buttons(
         to="254712345678",
         body_text="Choose an option:",
         buttons=[
@@ -223,13 +382,6 @@ def send_interactive_buttons(to, body_text, buttons):
     )
     """
     try:
-        url = f"https://graph.facebook.com/v18.0/{META_PHONE_NUMBER_ID}/messages"
-        
-        headers = {
-            'Authorization': f'Bearer {META_ACCESS_TOKEN}',
-            'Content-Type': 'application/json'
-        }
-        
         payload = {
             'messaging_product': 'whatsapp',
             'to': to,
@@ -245,27 +397,31 @@ def send_interactive_buttons(to, body_text, buttons):
             }
         }
         
-        response = requests.post(url, headers=headers, json=payload)
-        logger.info(f"Interactive message: {response.status_code}")
+        status, _ = await post_message(payload)
+        logger.info("Interactive message: %s", status)
         
     except Exception as e:
-        logger.error(f"Error sending interactive: {e}")
+        logger.error("Error sending interactive: %s", e)
 
-@app.route('/health', methods=['GET'])
-def health_check():
+# Credentials are fixed at import, so the health payload never changes;
+# serialize it once instead of on every probe
+_HEALTH_BODY = json_dumps({
+    'status': 'healthy',
+    'service': 'whatsapp-webhook',
+    'credentials_loaded': all([
+        META_ACCESS_TOKEN,
+        META_VERIFY_TOKEN,
+        META_PHONE_NUMBER_ID
+    ])
+})
+
+@app.get('/health')
+async def health_check():
     """Health check endpoint for monitoring"""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'whatsapp-webhook',
-        'credentials_loaded': all([
-            META_ACCESS_TOKEN,
-            META_VERIFY_TOKEN,
-            META_PHONE_NUMBER_ID
-        ])
-    }), 200
-
-@app.route('/send', methods=['POST'])
-def send_endpoint():
+    return Response(_HEALTH_BODY, status_code=200, media_type='application/json')
+
+@app.post('/send')
+async def send_endpoint(request: Request):
     """
     API endpoint to send messages
     POST /send
@@ -275,18 +431,18 @@ def send_endpoint():
     }
     """
     try:
-        data = request.get_json()
+        data = json_loads(await request.body())
         to = data.get('to')
         message = data.get('message')
         
         if not to or not message:
-            return jsonify({'error': 'Missing to or message'}), 400
+            return JSONResponse({'error': 'Missing to or message'}, status_code=400)
         
-        send_message(to, message)
-        return jsonify({'status': 'sent'}), 200
+        await send_message(to, message)
+        return JSONResponse({'status': 'sent'}, status_code=200)
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return JSONResponse({'error': str(e)}, status_code=500)
 
 if __name__ == '__main__':
     logger.info(f"""
@@ -308,4 +464,6 @@ if __name__ == '__main__':
    3. Set webhook verify token in Meta to: {META_VERIFY_TOKEN}
 """)
     
-    app.run(host='0.0.0.0', port=WEBHOOK_PORT, debug=False)
\ No newline at end of file
+    # Single process for local runs; production uses gunicorn.conf.py (see Procfile)
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=WEBHOOK_PORT)
\ No newline at end of file